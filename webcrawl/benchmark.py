@@ -0,0 +1,702 @@
+# -*- coding: utf-8 -*-
+"""
+Offline benchmarks for web_crawl.py.
+
+    python webcrawl/benchmark.py keywords [--articles 300] [--seed 7]
+    python webcrawl/benchmark.py render [--sizes 10,100,1000] [--seed 7]
+    python webcrawl/benchmark.py backfill [--articles 20000] [--seed 7]
+    python webcrawl/benchmark.py selectors [--fixtures webcrawl/fixtures/articles]
+    python webcrawl/benchmark.py e2e [--scales 10,100,1000] [--latency-ms 50] [--fail-rate 0.02]
+    python webcrawl/benchmark.py e2e --compare [--scales 1,10]
+
+The keywords, render and backfill benchmarks first check the optimized code against a
+reference copy of the previous implementation (or, where behaviour changed on
+purpose, against the invariants it must keep) and exit non-zero on any mismatch.
+
+The selectors check runs the publisher fast path over saved article pages, one
+<name>.html per page with a <name>.json giving its real URL (which picks the
+selectors), its first and last body paragraphs and text that must not be
+extracted (teasers, captions, newsletter prompts). Every ARTICLE_SELECTORS domain
+needs at least one page. The pages in fixtures/articles follow each publisher's
+layout, including a teaser card ahead of the body; replace or add to them with
+pages saved from the live sites when the selectors change.
+
+The e2e benchmark runs the whole crawler without the network. Local HTTP
+servers stand in for the RSS feeds, the publishers' article pages and Gemini's
+generateContent, a fake worksheet stands in for Google Sheets and a local SMTP
+sink receives the digest. Like the real feed list, every other stand-in feed is
+a Google News search: its links are news.google.com-style redirects (half with
+the URL embedded in the id, half needing the page and batchexecute requests)
+and some of them re-list the previous direct feed's articles. Each scale runs in a fresh subprocess and state
+directory and reports throughput, end-to-end latency and peak RSS. With
+--compare every scale runs in both the streaming and the --sequential crawl
+mode, and the archive rows they write must match.
+"""
+import os
+import re
+import sys
+import json
+import time
+import base64
+import hashlib
+import random
+import argparse
+import tempfile
+import threading
+import subprocess
+import socketserver
+from html import escape
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from http.server import BaseHTTPRequestHandler, SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import web_crawl
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "articles")
+FILLER_WORDS = (
+    "the a of and to in for on with at by from residents community said year new "
+    "singapore support families programme centre service people help public health "
+    "volunteers event week project school children youth elderly care fund report "
+    "muslim funeral kidney charity donation zakat needy"
+).split()
+# Filler minus any word that appears in a keyword, so unmatched articles stay unmatched.
+NEUTRAL_WORDS = [
+    w for w in FILLER_WORDS
+    if not any(w in kw.lower().split() for kw in web_crawl.keywords)
+]
+
+
+# --- Reference implementations (behaviour before the optimized versions) ---
+
+def legacy_contains_keywords(text, headline):
+    score, best_kw, best_group = 0, None, None
+    best_match_score = 0
+    h_lower, t_lower = headline.lower(), text.lower()
+    full_text_lower = f"{h_lower} {t_lower}"
+
+    if any(re.search(rf"\b{re.escape(ex)}\b", full_text_lower) for ex in web_crawl.EXCLUSION_KEYWORDS):
+        return None, None
+
+    for group, group_kws in web_crawl.keyword_groups.items():
+        for kw in group_kws:
+            kw_l = kw.lower()
+            h_count = len(re.findall(rf"\b{re.escape(kw_l)}\b", h_lower, re.IGNORECASE))
+            t_count = len(re.findall(rf"\b{re.escape(kw_l)}\b", t_lower, re.IGNORECASE))
+            current_score = (h_count * 2) + t_count
+
+            if current_score > 0:
+                is_political = any(re.search(rf"\b{re.escape(pk.lower())}\b", full_text_lower, re.IGNORECASE) for pk in web_crawl.POLITICAL_EXCLUSION_KEYWORDS)
+                if not is_political:
+                    is_mtfa_group = "MTFA" in group or "Ihsan" in group or "Darul" in group
+                    score += (current_score * 3) if is_mtfa_group else current_score
+
+                    if group in web_crawl.CORE_RELEVANT_GROUPS and current_score > best_match_score:
+                        best_match_score = current_score
+                        best_kw, best_group = kw, group
+
+    is_core_group = best_group and any(k in str(best_group) for k in ["MTFA", "Ihsan", "Darul", "Competitor"])
+    final_threshold = 3 if is_core_group else 5
+
+    return (best_kw, best_group) if score >= final_threshold and best_kw else (None, None)
+
+def legacy_highlight_keywords(summary, keywords_to_highlight):
+    processed_summary = summary
+    for kw in sorted(keywords_to_highlight, key=len, reverse=True):
+        processed_summary = re.sub(rf"\b({re.escape(kw)})\b", r"<span style='color:#006a4e; background-color:#e8f5e9; font-weight:bold; padding:0 3px; border-radius:3px;'>\1</span>", processed_summary, flags=re.IGNORECASE)
+    return processed_summary
+
+
+# --- Synthetic corpus ---
+
+def make_text(rng, words, keyword_rate, filler=FILLER_WORDS, terms=None):
+    if terms is None:
+        terms = web_crawl.keywords + web_crawl.EXCLUSION_KEYWORDS + web_crawl.POLITICAL_EXCLUSION_KEYWORDS
+    out = []
+    for _ in range(words):
+        if rng.random() < keyword_rate:
+            term = rng.choice(terms)
+            out.append(rng.choice([term, term.upper(), term.lower(), f"({term})", f"{term}s", f"x{term}"]))
+        else:
+            out.append(rng.choice(filler))
+    return " ".join(out)
+
+def make_corpus(n, seed):
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(n):
+        headline = make_text(rng, rng.randint(6, 14), 0.08)
+        text = make_text(rng, rng.randint(200, 1200), rng.choice([0.0, 0.002, 0.01, 0.03]))
+        corpus.append((text, headline))
+    return corpus
+
+def make_articles(n, seed):
+    rng = random.Random(seed)
+    groups = list(web_crawl.keyword_groups)
+    return [{
+        "headline": make_text(rng, rng.randint(6, 14), 0.05),
+        "summary": make_text(rng, rng.randint(40, 90), 0.06),
+        "link": f"https://example.com/news/{i}",
+        "sentiment": rng.choice(["POSITIVE", "NEUTRAL", "NEGATIVE"]),
+        "image": rng.choice(["", f"https://example.com/img/{i}.jpg"]),
+        "keyword_group": rng.choice(groups),
+        "date": datetime.now(timezone.utc),
+    } for i in range(n)]
+
+def make_item(seed, feed_no, item_no, match_rate, syndication_rate=0.0):
+    """
+    Deterministic title, RSS summary and article paragraphs for one feed item. With
+    syndication_rate, that share of items re-run an earlier feed's item as a lightly
+    edited wire copy.
+    """
+    rng = random.Random(f"{seed}-{feed_no}-{item_no}")
+    if feed_no and rng.random() < syndication_rate:
+        item = make_item(seed, rng.randrange(feed_no), item_no, match_rate)
+        paragraphs = [" ".join(w for w in p.split() if rng.random() > 0.02) for p in item["paragraphs"]]
+        return {
+            "title": item["title"],
+            "summary": item["summary"],
+            "paragraphs": [f"SINGAPORE ({rng.choice(['Reuters', 'AFP', 'Bernama'])}) - {paragraphs[0]}"] + paragraphs[1:],
+        }
+    rate = 0.03 if rng.random() < match_rate else 0.0
+    text = lambda words, r: make_text(rng, words, r, NEUTRAL_WORDS, web_crawl.keywords)
+    return {
+        "title": text(rng.randint(6, 12), rate * 2),
+        "summary": text(rng.randint(20, 40), rate),
+        "paragraphs": [text(rng.randint(40, 90), rate) for _ in range(rng.randint(4, 12))],
+    }
+
+def google_news_id(payload):
+    """A Google News article id: base64 protobuf with the URL (or an opaque token) as field 4."""
+    payload = payload.encode("utf-8")
+    return base64.urlsafe_b64encode(b"\x08\x13\x22" + bytes([len(payload)]) + payload + b"\xd2\x01\x00").decode().rstrip("=")
+
+def google_news_payload(article_id):
+    raw = base64.urlsafe_b64decode(article_id + "=" * (-len(article_id) % 4))
+    return raw[4:4 + raw[3]].decode("utf-8")
+
+def timed(fn, items):
+    start = time.perf_counter()
+    results = [fn(*item) for item in items]
+    return results, time.perf_counter() - start
+
+
+# --- Benchmarks ---
+
+def bench_keywords(args):
+    corpus = make_corpus(args.articles, args.seed)
+    legacy, legacy_s = timed(legacy_contains_keywords, corpus)
+    current, current_s = timed(web_crawl.contains_keywords, corpus)
+
+    mismatches = [i for i, (a, b) in enumerate(zip(legacy, current)) if a != b]
+    hits = sum(1 for kw, _ in current if kw)
+    print(f"contains_keywords parity: {len(corpus) - len(mismatches)}/{len(corpus)} identical ({hits} hits)")
+    for i in mismatches[:5]:
+        print(f"  mismatch #{i}: legacy={legacy[i]} current={current[i]}")
+
+    print(f"legacy   : {legacy_s * 1000 / len(corpus):8.2f} ms/article")
+    print(f"current  : {current_s * 1000 / len(corpus):8.2f} ms/article ({legacy_s / current_s:.1f}x)")
+    return 1 if mismatches else 0
+
+def bench_backfill(args):
+    corpus = make_corpus(args.articles, args.seed)
+    docs = [(headline, text) for text, headline in corpus]
+    # Rules as someone tuning them might change them: a new group, exclusion and threshold input.
+    changed = web_crawl.KeywordMatcher(
+        dict(web_crawl.keyword_groups, Test_Volunteers=["volunteers", "elderly care"]),
+        web_crawl.EXCLUSION_KEYWORDS + ["youth fund"], web_crawl.POLITICAL_EXCLUSION_KEYWORDS,
+        web_crawl.CORE_RELEVANT_GROUPS + ["Test_Volunteers"],
+    )
+
+    failures = 0
+    with tempfile.TemporaryDirectory(prefix="backfill-bench-") as tmp:
+        cache_file = os.path.join(tmp, "backfill_matrix.npz")
+        runs = [
+            ("current rules, cold cache", web_crawl.KEYWORD_MATCHER),
+            ("current rules, warm cache", web_crawl.KEYWORD_MATCHER),
+            ("changed rules, warm cache", changed),
+        ]
+        for name, matcher in runs:
+            reference, reference_s = timed(matcher.match, corpus)
+            start = time.perf_counter()
+            archive = web_crawl.ArchiveMatrix(docs, cache_file)
+            verdicts = web_crawl.classify_archive(archive, matcher)
+            vector_s = time.perf_counter() - start
+            archive.save()
+
+            mismatches = [i for i, (a, b) in enumerate(zip(reference, verdicts)) if a != b]
+            failures += len(mismatches)
+            hits = sum(1 for kw, _ in verdicts if kw)
+            print(f"{name}: {len(corpus) - len(mismatches)}/{len(corpus)} identical ({hits} hits); "
+                  f"per-article loop {reference_s:6.2f}s, backfill {vector_s:6.2f}s ({len(archive.scanned)} scanned, "
+                  f"{reference_s / vector_s:.1f}x)")
+            for i in mismatches[:5]:
+                print(f"  mismatch #{i}: loop={reference[i]} backfill={verdicts[i]}")
+    return 1 if failures else 0
+
+def bench_render(args):
+    failures = 0
+    for size in [int(s) for s in args.sizes.split(",")]:
+        articles = make_articles(size, args.seed)
+        items = [(art["summary"], web_crawl.keywords) for art in articles]
+        legacy, legacy_s = timed(legacy_highlight_keywords, items)
+        current, current_s = timed(web_crawl.highlight_keywords, items)
+
+        # Only markup may be added, and highlights must never nest or land inside a tag.
+        bad = [
+            i for i, out in enumerate(current)
+            if re.sub(r"<[^>]*>", "", out) != articles[i]["summary"]
+            or re.search(r"<span[^>]*>[^<]*<span", out)
+        ]
+        nested_legacy = sum(1 for out in legacy if re.search(r"<span[^>]*>[^<]*<span|<span [^>]*<span", out))
+        failures += len(bad)
+
+        start = time.perf_counter()
+        web_crawl.render_email(articles)
+        render_s = time.perf_counter() - start
+
+        print(f"{size:5d} articles: highlight legacy {legacy_s * 1000:8.1f} ms, current {current_s * 1000:7.1f} ms "
+              f"({legacy_s / current_s:5.1f}x); full render {render_s * 1000:7.1f} ms; "
+              f"legacy nested spans in {nested_legacy}, invariant failures {len(bad)}")
+    return 1 if failures else 0
+
+class FixtureHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+def bench_selectors(args):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(FixtureHandler, directory=args.fixtures))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    failures = 0
+    covered = set()
+    for name in sorted(n[:-len(".json")] for n in os.listdir(args.fixtures) if n.endswith(".json")):
+        with open(os.path.join(args.fixtures, f"{name}.json"), "r", encoding="utf-8") as f:
+            expected = json.load(f)
+        host = urlsplit(expected["url"]).hostname or ""
+        domain = next((d for d in web_crawl.ARTICLE_SELECTORS if host == d or host.endswith("." + d)), None)
+        if domain is None:
+            failures += 1
+            print(f"{name:>24}: no ARTICLE_SELECTORS entry for {host}")
+            continue
+        covered.add(domain)
+
+        start = time.perf_counter()
+        text, _, _ = web_crawl.fetch_with_selectors(f"{base_url}/{name}.html", web_crawl.ARTICLE_SELECTORS[domain])
+        elapsed = time.perf_counter() - start
+        if not text:
+            problems = ["selectors found too little, fell back to newspaper3k"]
+        else:
+            problems = [f"extracted {unwanted[:40]!r}..." for unwanted in expected.get("absent", []) if unwanted in text]
+            if not text.startswith(expected["first"]):
+                problems.append(f"starts with {text[:40]!r}...")
+            if not text.endswith(expected["last"]):
+                problems.append(f"ends with ...{text[-40:]!r}")
+        failures += bool(problems)
+        print(f"{name:>24}: {len(text):5d} chars in {elapsed * 1000:6.1f} ms, {'; '.join(problems) or 'ok'}")
+
+    for domain in sorted(set(web_crawl.ARTICLE_SELECTORS) - covered):
+        failures += 1
+        print(f"{domain:>24}: no fixture page")
+    server.shutdown()
+    return 1 if failures else 0
+
+# --- Local stand-ins for the network ---
+
+class StandInServer(ThreadingHTTPServer):
+    """
+    Serves /feed/<n>.xml, /article/<feed>-<item>.html and Gemini's generateContent.
+    """
+    daemon_threads = True
+
+    def __init__(self, args, fixtures):
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+        self.args = args
+        self.fixtures = fixtures
+        self.base_url = f"http://127.0.0.1:{self.server_port}"
+        self.published = datetime.now(timezone.utc) - timedelta(minutes=5)
+        self.counts = {}
+        self._lock = threading.Lock()
+
+    def count(self, name):
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body=b"", content_type="text/html; charset=utf-8", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _delay(self, mean_ms):
+        if mean_ms > 0:
+            time.sleep(random.expovariate(1000.0 / mean_ms))
+
+    def do_GET(self):
+        server, args = self.server, self.server.args
+        path = urlsplit(self.path).path
+        self._delay(args.latency_ms)
+        # Failures depend on the path only, so repeated runs hit the same outages.
+        if random.Random(f"{args.seed}-{path}").random() < args.fail_rate:
+            server.count("injected_failures")
+            return self._reply(503, b"unavailable")
+
+        m = re.fullmatch(r"/feed/(\d+)\.xml", path)
+        if m:
+            feed_no = int(m.group(1))
+            etag = f'"feed-{feed_no}-{args.seed}"'
+            if self.headers.get("If-None-Match") == etag:
+                server.count("feed_304")
+                return self._reply(304, headers={"ETag": etag})
+            server.count("feed")
+            return self._reply(200, self._feed_xml(feed_no), "application/rss+xml; charset=utf-8", {"ETag": etag})
+
+        m = re.fullmatch(r"/article/(\d+)-(\d+)\.html", path)
+        if m:
+            server.count("article")
+            return self._reply(200, self._article_html(int(m.group(1)), int(m.group(2))))
+
+        m = re.fullmatch(r"/rss/articles/([A-Za-z0-9_-]+)", path)
+        if m:
+            payload = google_news_payload(m.group(1))
+            if payload.startswith("http"):
+                server.count("google_redirect")
+                return self._reply(302, headers={"Location": payload})
+            # Newer ids get a page whose script finds the URL; the crawler only reads its attributes.
+            server.count("google_page")
+            return self._reply(200, (
+                f'<html><body><c-wiz><div jscontroller="aLI87" data-n-a-id="{m.group(1)}" '
+                f'data-n-a-ts="1700000000" data-n-a-sg="sig-{payload}"></div></c-wiz></body></html>'
+            ).encode("utf-8"))
+
+        self._reply(404, b"not found")
+
+    def do_POST(self):
+        server, args = self.server, self.server.args
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if urlsplit(self.path).path == "/_/DotsSplashUi/data/batchexecute":
+            self._delay(args.latency_ms)
+            server.count("google_batchexecute")
+            request = json.loads(json.loads(parse_qs(body.decode("utf-8"))["f.req"][0])[0][0][1])
+            feed_no, item_no = map(int, google_news_payload(request[2])[len("AU_yqL"):].split("-"))
+            answer = json.dumps([["wrb.fr", "Fbv4je", json.dumps(["garturlres", self._article_url(feed_no, item_no), 1]), None, None, None, "generic"]])
+            return self._reply(200, f")]}}'\n\n{answer}".encode("utf-8"), "application/json")
+        payload = json.loads(body or b"{}")
+        if ":generateContent" not in self.path:
+            return self._reply(404, b"not found")
+        self._delay(args.llm_latency_ms)
+        if random.random() < args.llm_fail_rate:
+            server.count("llm_failures")
+            return self._reply(503, b"{}", "application/json", {"Retry-After": "0.1"})
+
+        server.count("llm")
+        prompt = payload["contents"][0]["parts"][0]["text"]
+        if "generationConfig" in payload:
+            # The template indents the article list, so "Article 0:" starts after whitespace.
+            count = len(re.findall(r"^\s*Article \d+:", prompt, re.M))
+            text = json.dumps([
+                {"id": n, "summary": f"Stand-in batch summary for article {n} of the digest.", "sentiment": "NEUTRAL"}
+                for n in range(count)
+            ])
+        else:
+            text = "Stand-in summary of the article for the digest. TAG: [NEUTRAL]"
+        body = json.dumps({"candidates": [{"content": {"parts": [{"text": text}]}, "finishReason": "STOP"}]})
+        self._reply(200, body.encode(), "application/json")
+
+    def _source(self, feed_no, item_no):
+        """The (feed, item) whose article a feed item links to; Google News feeds re-list some."""
+        args = self.server.args
+        if feed_no % 2 and random.Random(f"{args.seed}-relist-{feed_no}-{item_no}").random() < args.relist_rate:
+            return feed_no - 1, item_no
+        return feed_no, item_no
+
+    def _article_url(self, feed_no, item_no):
+        source = self._source(feed_no, item_no)
+        return f"{self.server.base_url}/article/{source[0]}-{source[1]}.html"
+
+    def _feed_xml(self, feed_no):
+        server, args = self.server, self.server.args
+        items = []
+        for item_no in range(args.items_per_feed):
+            item = make_item(args.seed, *self._source(feed_no, item_no), args.match_rate, args.syndication_rate)
+            if not feed_no % 2:
+                link = f"{server.base_url}/article/{feed_no}-{item_no}.html?utm_source=rss&amp;utm_medium=feed"
+            elif item_no % 2:
+                link = f"{server.base_url}/rss/articles/{google_news_id(f'AU_yqL{feed_no}-{item_no}')}?oc=5"
+            else:
+                link = f"{server.base_url}/rss/articles/{google_news_id(self._article_url(feed_no, item_no))}?oc=5"
+            published = format_datetime(server.published - timedelta(minutes=item_no))
+            items.append(
+                f"<item><title>{escape(item['title'])}</title><link>{link}</link><guid>{link}</guid>"
+                f"<description>{escape(item['summary'])}</description><pubDate>{published}</pubDate></item>"
+            )
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+            f"<title>Stand-in feed {feed_no}</title><link>{server.base_url}</link><description>benchmark</description>"
+            + "".join(items) + "</channel></rss>"
+        ).encode("utf-8")
+
+    def _article_html(self, feed_no, item_no):
+        server, args = self.server, self.server.args
+        if server.fixtures:
+            return server.fixtures[(feed_no * args.items_per_feed + item_no) % len(server.fixtures)]
+        item = make_item(args.seed, feed_no, item_no, args.match_rate, args.syndication_rate)
+        body = "".join(f"<p>{escape(p)}</p>" for p in item["paragraphs"])
+        # Publisher pages carry far more script and markup than article text, most of it after the body.
+        padding = "x" * (args.page_kb * 1024 // 3)
+        return (
+            f"<!DOCTYPE html><html><head><title>{escape(item['title'])}</title>"
+            f'<meta property="og:image" content="{server.base_url}/img/{feed_no}-{item_no}.jpg">'
+            f'<script type="application/json">"{padding}"</script></head>'
+            f"<body><header><nav>Home | Singapore | World</nav></header>"
+            f"<article><h1>{escape(item['title'])}</h1>{body}</article>"
+            f"<footer>Sign up now: Get ST's newsletters delivered to your inbox</footer>"
+            f'<script>var related = "{padding}{padding}";</script></body></html>'
+        ).encode("utf-8")
+
+class SmtpSink(socketserver.ThreadingTCPServer):
+    """Accepts and counts messages; enough SMTP for smtplib's EHLO/AUTH/MAIL/RCPT/DATA."""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), SmtpSinkHandler)
+        self.messages = []
+
+class SmtpSinkHandler(socketserver.StreamRequestHandler):
+    def _send(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        self._send("220 bench-smtp ready")
+        in_data, lines = False, []
+        for raw in self.rfile:
+            if in_data:
+                if raw.rstrip(b"\r\n") == b".":
+                    self.server.messages.append(b"".join(lines))
+                    in_data, lines = False, []
+                    self._send("250 OK queued")
+                else:
+                    lines.append(raw)
+                continue
+            command = raw.decode("utf-8", "replace").strip().upper()
+            if command.startswith("EHLO"):
+                self._send("250-bench-smtp")
+                self._send("250-AUTH PLAIN LOGIN")
+                self._send("250 OK")
+            elif command.startswith("AUTH"):
+                self._send("235 Authentication successful")
+            elif command == "DATA":
+                in_data = True
+                self._send("354 End data with <CR><LF>.<CR><LF>")
+            elif command == "QUIT":
+                self._send("221 Bye")
+                break
+            else:
+                self._send("250 OK")
+
+class FakeSheet:
+    """Stand-in for the archive worksheet with the calls run_crawl makes."""
+
+    def __init__(self, latency_ms=0):
+        self.latency = latency_ms / 1000.0
+        self.rows = []
+        self.calls = 0
+
+    def col_values(self, col):
+        self.calls += 1
+        time.sleep(self.latency)
+        return [row[col - 1] for row in self.rows]
+
+    def append_rows(self, rows):
+        self.calls += 1
+        time.sleep(self.latency)
+        self.rows.extend(rows)
+
+def load_fixtures(path):
+    if not path:
+        return []
+    pages = []
+    for name in sorted(os.listdir(path)):
+        if name.endswith((".html", ".htm")):
+            with open(os.path.join(path, name), "rb") as f:
+                pages.append(f.read())
+    return pages
+
+def bench_e2e_worker(args):
+    import resource
+
+    feeds = [f"{args.base_url}/feed/{n}.xml" for n in range(args.feeds)]
+    sheet = FakeSheet(args.sheet_latency_ms)
+    start = time.perf_counter()
+    data = web_crawl.run_crawl(feeds, sheet=sheet, sequential=args.sequential)
+    elapsed = time.perf_counter() - start
+    # Everything but the LLM-written summary, which batching may word differently.
+    rows = [row[:2] + row[3:] for row in sheet.rows]
+
+    report = web_crawl.STATS.report()
+    # Includes the extraction processes, which run_crawl has shut down and reaped by now.
+    peak_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss + resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    print(json.dumps({
+        "seconds": elapsed,
+        "candidates": report["counters"].get("candidates", 0),
+        "matches": len(data),
+        "sheet_rows": len(sheet.rows),
+        "cluster_duplicates": report["counters"].get("cluster_duplicates", 0),
+        "sheet_calls": sheet.calls,
+        "peak_rss_mb": peak_rss_kb / 1024.0,
+        "rows_digest": hashlib.sha256(json.dumps(rows).encode()).hexdigest(),
+        "stages": report["stages"],
+        "counters": report["counters"],
+    }))
+    return 0
+
+def run_e2e_worker(server, smtp, args, feeds, sequential):
+    with tempfile.TemporaryDirectory(prefix="crawl-bench-") as tmp:
+        env = dict(
+            os.environ,
+            CRAWL_STATE_DIR=os.path.join(tmp, "state"),
+            RUN_REPORT_FILE=os.path.join(tmp, "run_report.json"),
+            GEMINI_ENDPOINT=server.base_url,
+            GEMINI_API_KEY="bench",
+            GEMINI_RPM=str(args.gemini_rpm),
+            GEMINI_TIME_BUDGET="86400",
+            SMTP_HOST="127.0.0.1",
+            SMTP_PORT=str(smtp.server_address[1]),
+            SMTP_SSL="0",
+            GOOGLE_NEWS_ENDPOINT=server.base_url,
+            SENDER_EMAIL="bench@example.com",
+            EMAIL_PASSWORD="bench",
+            FEED_DEADLINE="86400",
+            DOWNLOAD_DEADLINE="86400",
+            CRAWL_DEADLINE="86400",
+            # The stand-in article pages get the publisher fast path.
+            ARTICLE_SELECTORS=json.dumps({"127.0.0.1": {"body": "article p", "until": "</article>"}}),
+        )
+        if args.newspaper_only:
+            env["FAST_EXTRACT"] = "0"
+        if args.no_resolve:
+            env["RESOLVE_GOOGLE_NEWS"] = "0"
+        if not args.polite:
+            # Every stand-in lives on 127.0.0.1, so per-host politeness would serialize the run.
+            env.update(FEED_HOST_DELAY="0", DOWNLOAD_DOMAIN_DELAY="0", GOOGLE_NEWS_DELAY="0", DOWNLOAD_PER_DOMAIN=env.get("DOWNLOAD_WORKERS", "8"))
+        cmd = [
+            sys.executable, os.path.abspath(__file__), "e2e-worker",
+            "--base-url", server.base_url, "--feeds", str(feeds), "--sheet-latency-ms", str(args.sheet_latency_ms),
+        ]
+        if sequential:
+            cmd.append("--sequential")
+        return subprocess.run(cmd, cwd=tmp, env=env, capture_output=True, text=True)
+
+def bench_e2e(args):
+    server = StandInServer(args, load_fixtures(args.fixtures))
+    smtp = SmtpSink()
+    for srv in (server, smtp):
+        threading.Thread(target=srv.serve_forever, daemon=True).start()
+
+    modes = [False, True] if args.compare else [args.sequential]
+    print(f"{'scale':>6} {'mode':>10} {'feeds':>6} {'entries':>8} {'rows':>6} {'hits':>6} {'dups':>5} {'seconds':>9} {'entries/s':>10} {'ms/art':>7} {'peak MB':>8} {'LLM':>6} {'GN req':>6} {'mails':>6}")
+    failures = 0
+    for scale in [int(s) for s in args.scales.split(",")]:
+        feeds = len(web_crawl.RSS_FEEDS) * scale
+        digests = set()
+        for sequential in modes:
+            mode = "sequential" if sequential else "streaming"
+            google = ("google_redirect", "google_page", "google_batchexecute")
+            llm_before, mails_before = server.counts.get("llm", 0), len(smtp.messages)
+            google_before = sum(server.counts.get(name, 0) for name in google)
+            proc = run_e2e_worker(server, smtp, args, feeds, sequential)
+            if proc.returncode != 0:
+                failures += 1
+                print(f"{scale:>5}x {mode:>10} worker failed:\n{proc.stderr[-2000:]}")
+                continue
+            result = json.loads(proc.stdout.strip().splitlines()[-1])
+            digests.add(result["rows_digest"])
+            rate = result["candidates"] / result["seconds"] if result["seconds"] else 0.0
+            download, parse = (result["stages"].get(name, {"calls": 0, "seconds": 0.0}) for name in ("article_download", "article_parse"))
+            per_article = 1000 * (download["seconds"] + parse["seconds"]) / max(1, download["calls"])
+            google_requests = sum(server.counts.get(name, 0) for name in google) - google_before
+            print(f"{scale:>5}x {mode:>10} {feeds:>6} {result['candidates']:>8} {result['sheet_rows']:>6} {result['matches']:>6} {result['cluster_duplicates']:>5} "
+                  f"{result['seconds']:>9.2f} {rate:>10.1f} {per_article:>7.1f} {result['peak_rss_mb']:>8.1f} {server.counts.get('llm', 0) - llm_before:>6} {google_requests:>6} "
+                  f"{len(smtp.messages) - mails_before:>6}")
+            if args.verbose:
+                print(json.dumps({"stages": result["stages"], "counters": result["counters"]}, indent=2))
+        if len(digests) > 1:
+            failures += 1
+            print(f"{scale:>5}x MISMATCH: streaming and sequential runs wrote different archive rows")
+
+    server.shutdown()
+    smtp.shutdown()
+    return 1 if failures else 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("keywords", help="contains_keywords parity check and micro-benchmark")
+    p.add_argument("--articles", type=int, default=300)
+    p.add_argument("--seed", type=int, default=7)
+    p.set_defaults(func=bench_keywords)
+
+    p = sub.add_parser("render", help="keyword highlighting and digest rendering benchmark")
+    p.add_argument("--sizes", default="10,100,1000")
+    p.add_argument("--seed", type=int, default=7)
+    p.set_defaults(func=bench_render)
+
+    p = sub.add_parser("backfill", help="vectorized archive re-scoring parity check and benchmark")
+    p.add_argument("--articles", type=int, default=20000)
+    p.add_argument("--seed", type=int, default=7)
+    p.set_defaults(func=bench_backfill)
+
+    p = sub.add_parser("selectors", help="publisher fast-path extraction check on saved pages")
+    p.add_argument("--fixtures", default=FIXTURES_DIR, help="directory of .html pages with .json expectations")
+    p.set_defaults(func=bench_selectors)
+
+    p = sub.add_parser("e2e", help="offline end-to-end crawl against local stand-ins")
+    p.add_argument("--scales", default="10,100,1000", help="multiples of today's feed volume")
+    p.add_argument("--items-per-feed", type=int, default=web_crawl.FEED_ENTRY_LIMIT)
+    p.add_argument("--match-rate", type=float, default=0.15, help="share of items written to match keywords")
+    p.add_argument("--syndication-rate", type=float, default=0.1, help="share of items that are wire copies of another feed's item")
+    p.add_argument("--latency-ms", type=float, default=50.0, help="mean feed/article response delay")
+    p.add_argument("--fail-rate", type=float, default=0.02, help="share of feed/article requests answered 503")
+    p.add_argument("--llm-latency-ms", type=float, default=800.0)
+    p.add_argument("--llm-fail-rate", type=float, default=0.0)
+    p.add_argument("--sheet-latency-ms", type=float, default=300.0)
+    p.add_argument("--gemini-rpm", type=float, default=1e6)
+    p.add_argument("--fixtures", help="directory of recorded article .html pages to serve instead of generated ones")
+    p.add_argument("--page-kb", type=int, default=300, help="approximate size of a generated article page")
+    p.add_argument("--relist-rate", type=float, default=0.2, help="share of Google News items that re-list a direct feed's article")
+    p.add_argument("--no-resolve", action="store_true", help="keep Google News links unresolved (baseline)")
+    p.add_argument("--newspaper-only", action="store_true", help="disable the selector fast path (baseline)")
+    p.add_argument("--polite", action="store_true", help="keep the production per-host delays")
+    p.add_argument("--sequential", action="store_true", help="benchmark the sequential crawl mode")
+    p.add_argument("--compare", action="store_true", help="run both crawl modes and check they write the same rows")
+    p.add_argument("--seed", type=int, default=7)
+    p.add_argument("--verbose", action="store_true")
+    p.set_defaults(func=bench_e2e)
+
+    p = sub.add_parser("e2e-worker", help="(internal) one e2e crawl, run by the e2e benchmark")
+    p.add_argument("--base-url", required=True)
+    p.add_argument("--feeds", type=int, required=True)
+    p.add_argument("--sheet-latency-ms", type=float, default=0.0)
+    p.add_argument("--sequential", action="store_true")
+    p.set_defaults(func=bench_e2e_worker)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,22 +1,28 @@
 # -*- coding: utf-8 -*-
 import os
+import sys
 import re
 import json
 import time
+import queue
+import base64
 import random
+import hashlib
 import logging
-import smtplib
+import argparse
+import sqlite3
+import threading
 import http.client
 import urllib.parse
+import urllib.request
+from functools import lru_cache
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
 from datetime import datetime, timedelta, timezone
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.image import MIMEImage
 
-import feedparser
-import gspread
-from newspaper import Article, Config
-from google.oauth2.service_account import Credentials
+# feedparser, gspread, google-auth, newspaper3k, smtplib, multiprocessing and (for the
+# backfill command only) numpy/scipy are imported where they are used, so the keyword and
+# rendering commands start without loading them.
 
 # --- Configuration & Logging ---
 logging.basicConfig(
@@ -28,11 +34,171 @@ logging.basicConfig(
 # Gemini API Configuration
 apiKey = os.getenv("GEMINI_API_KEY", "") 
 GEMINI_MODEL = "gemini-2.5-flash"
+GEMINI_ENDPOINT = os.getenv("GEMINI_ENDPOINT", "https://generativelanguage.googleapis.com")
+GEMINI_RPM = float(os.getenv("GEMINI_RPM", "10"))  # token-bucket rate, match the project's Gemini quota
+GEMINI_CONCURRENCY = int(os.getenv("GEMINI_CONCURRENCY", "4"))
+GEMINI_TIME_BUDGET = float(os.getenv("GEMINI_TIME_BUDGET", "900"))  # seconds of LLM time per run
+GEMINI_TIMEOUT = 120
+SUMMARY_CONTENT_CHARS = 3500
+SUMMARY_PROMPT_TEMPLATE = """You are a media intelligence analyst for a non-profit organization.
+    Analyze the following article text (which may contain a short preview snippet). 
+    Summarize its key points in under 90 words. Focus on the specific details of any mentioned campaign, event, or initiative.
+    If the text is very short, just rewrite it clearly into a complete sentence. Ignore any lingering newsletter or subscription ads.
+    
+    Article Title: {headline}
+    Article Content: {content}
+    
+    Provide your response in this format:
+    [Your summary here]
+    
+    TAG: [POSITIVE], [NEUTRAL], or [NEGATIVE]"""
+
+# Batch mode: summarize up to SUMMARY_BATCH_SIZE articles per request (0 or 1 = one request per article)
+SUMMARY_BATCH_SIZE = int(os.getenv("SUMMARY_BATCH_SIZE", "0"))
+SUMMARY_BATCH_WAIT = float(os.getenv("SUMMARY_BATCH_WAIT", "2.0"))  # seconds the crawl pipeline waits to fill a batch
+SUMMARY_BATCH_PROMPT_TEMPLATE = """You are a media intelligence analyst for a non-profit organization.
+    Analyze each of the {count} articles below (some may contain only a short preview snippet).
+    For each one, summarize its key points in under 90 words. Focus on the specific details of any mentioned campaign, event, or initiative.
+    If the text is very short, just rewrite it clearly into a complete sentence. Ignore any lingering newsletter or subscription ads.
+    Classify each article's sentiment as POSITIVE, NEUTRAL or NEGATIVE.
+    
+    Return a JSON array with exactly one object per article, each with its "id", "summary" and "sentiment".
+    
+    {articles}"""
+SUMMARY_BATCH_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {
+            "id": {"type": "INTEGER"},
+            "summary": {"type": "STRING"},
+            "sentiment": {"type": "STRING", "enum": ["POSITIVE", "NEUTRAL", "NEGATIVE"]},
+        },
+        "required": ["id", "summary", "sentiment"],
+    },
+}
 
 # Google Sheets Configuration
 SHEET_ID = os.getenv("SHEET_ID", "your_spreadsheet_id_here")
 CREDENTIALS_FILE = "credentials2.json"
 
+# Email Configuration
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "465"))
+SMTP_SSL = os.getenv("SMTP_SSL", "1") != "0"
+SHEET_WRITE_RETRIES = 4
+
+# Local state (feed cache etc.), kept between GitHub Actions runs by actions/cache
+STATE_DIR = os.getenv("CRAWL_STATE_DIR", ".crawl_state")
+
+# Feed Polling Configuration
+FEED_CACHE_FILE = os.path.join(STATE_DIR, "feed_cache.json")
+FEED_WORKERS = int(os.getenv("FEED_WORKERS", "6"))
+FEED_HOST_DELAY = float(os.getenv("FEED_HOST_DELAY", "1.0"))  # seconds between requests to one feed host
+FEED_DEADLINE = float(os.getenv("FEED_DEADLINE", "180"))
+FEED_ENTRY_LIMIT = 25
+
+# URL Canonicalization Configuration
+URL_CACHE_FILE = os.path.join(STATE_DIR, "url_cache.sqlite3")
+URL_CACHE_TTL_DAYS = float(os.getenv("URL_CACHE_TTL_DAYS", "90"))
+RESOLVE_GOOGLE_NEWS = os.getenv("RESOLVE_GOOGLE_NEWS", "1") != "0"
+GOOGLE_NEWS_ENDPOINT = os.getenv("GOOGLE_NEWS_ENDPOINT", "https://news.google.com")
+GOOGLE_NEWS_DELAY = float(os.getenv("GOOGLE_NEWS_DELAY", "0.25"))  # seconds between resolution requests
+RESOLVE_WORKERS = int(os.getenv("RESOLVE_WORKERS", "4"))
+RESOLVE_TIMEOUT = 10
+RESOLVE_DEADLINE = float(os.getenv("RESOLVE_DEADLINE", "120"))  # seconds of link resolution per run
+TRACKING_PARAMS = {"fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid", "igshid", "_ga", "_gl", "cmpid", "ocid", "oc", "ref", "ref_src", "s_cid", "spm"}
+TRACKING_PARAM_PREFIXES = ("utm_",)
+
+# Summary Cache Configuration
+SUMMARY_CACHE_FILE = os.path.join(STATE_DIR, "summary_cache.sqlite3")
+SUMMARY_CACHE_TTL_DAYS = float(os.getenv("SUMMARY_CACHE_TTL_DAYS", "30"))
+SUMMARY_CACHE_MAX_ENTRIES = int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", "5000"))
+
+# Sheet rows waiting to be written, replayed on the next run if a flush fails
+SHEET_SPOOL_FILE = os.path.join(STATE_DIR, "sheet_spool.jsonl")
+
+# Per-day run journal, so a restarted run resumes instead of starting over
+JOURNAL_DIR = os.path.join(STATE_DIR, "journal")
+JOURNAL_RETENTION_DAYS = int(os.getenv("JOURNAL_RETENTION_DAYS", "30"))
+
+# Digest written instead of emailed by --dry-run and the render command
+DIGEST_PREVIEW_FILE = os.getenv("DIGEST_PREVIEW_FILE", "digest_preview.html")
+
+# Run report and optional profiling (CRAWL_PROFILE=cprofile,tracemalloc)
+RUN_REPORT_FILE = os.getenv("RUN_REPORT_FILE", "run_report.json")
+PROFILE_FILE = os.getenv("PROFILE_FILE", "crawl_profile.prof")
+CRAWL_PROFILE = {p.strip() for p in os.getenv("CRAWL_PROFILE", "").lower().split(",") if p.strip()}
+
+# Seen-URL Index Configuration
+SEEN_INDEX_FILE = os.path.join(STATE_DIR, "seen_index.sqlite3")
+SEEN_RETENTION_DAYS = int(os.getenv("SEEN_RETENTION_DAYS", "60"))
+REBUILD_SEEN_INDEX = os.getenv("REBUILD_SEEN_INDEX", "") == "1"
+
+# Article Download Configuration
+DOWNLOAD_WORKERS = int(os.getenv("DOWNLOAD_WORKERS", "8"))
+DOWNLOAD_PER_DOMAIN = int(os.getenv("DOWNLOAD_PER_DOMAIN", "2"))
+DOWNLOAD_DOMAIN_DELAY = float(os.getenv("DOWNLOAD_DOMAIN_DELAY", "1.0"))  # seconds between requests to one domain
+DOWNLOAD_DEADLINE = float(os.getenv("DOWNLOAD_DEADLINE", "600"))  # seconds of article downloading per run, in both crawl modes
+USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36'
+]
+
+# Fast-path Article Extraction
+# Per-domain CSS selectors for the article paragraphs ("body", a selector or a list tried in
+# order until one finds enough text), optional nodes to drop first ("drop") and a marker
+# after which the rest of the page is not read ("until"). Only set "until" when no body
+# selector can match past it: a catch-all such as "article p" would stop at a teaser card.
+# Other domains, and pages where the selectors find too little text, go through newspaper3k.
+# ARTICLE_SELECTORS (JSON, same shape) adds or overrides domains without a code change.
+# benchmark.py selectors checks these against the pages in fixtures/articles.
+ARTICLE_SELECTORS = {
+    "straitstimes.com": {
+        "body": ["div.field-name-body p, div.article-content-rawhtml p, [data-testid='article-body'] p", "article p"],
+        "drop": "figure, aside, .related-story, .newsletter-signup",
+    },
+    "channelnewsasia.com": {
+        "body": ["div.content-wrapper div.text-long p, div.text-long p", "article p"],
+        "drop": "figure, aside, .referenced-card",
+    },
+    "todayonline.com": {
+        "body": ["div.content-wrapper div.text-long p, div.text-long p", "article p"],
+        "drop": "figure, aside, .referenced-card",
+    },
+    "asiaone.com": {
+        "body": ["div.body p, div.article-body p", "article p"],
+        "drop": "figure, aside, .related",
+    },
+}
+ARTICLE_SELECTORS.update(json.loads(os.getenv("ARTICLE_SELECTORS", "{}")))
+FAST_EXTRACT = os.getenv("FAST_EXTRACT", "1") != "0"
+FAST_EXTRACT_MIN_CHARS = 200
+ARTICLE_MAX_BYTES = int(os.getenv("ARTICLE_MAX_BYTES", "1500000"))
+# Worker processes for selector parsing. Off by default: each one costs ~30 MB of RSS, and
+# parsing on the download threads already keeps up with the downloads.
+EXTRACT_PROCESSES = int(os.getenv("EXTRACT_PROCESSES", "0"))
+
+# Relevance Prefilter Configuration
+# off: download every entry; safe: skip entries whose title or RSS summary hits an
+# exclusion/political term; aggressive: also skip entries whose metadata has no keyword hit.
+RELEVANCE_PRUNING = os.getenv("RELEVANCE_PRUNING", "safe").lower()
+RELEVANCE_AUDIT_RATE = float(os.getenv("RELEVANCE_AUDIT_RATE", "0.1"))  # share of prunes still downloaded to measure losses
+
+# Near-duplicate Clustering
+# Matched articles whose SimHash fingerprints differ in at most this many of 64 bits are
+# one story: one summary and one digest card listing every source. -1 disables clustering.
+CLUSTER_MAX_DISTANCE = int(os.getenv("CLUSTER_MAX_DISTANCE", "10"))
+CLUSTER_MIN_WORDS = 50  # shorter texts (RSS snippets) are never clustered
+
+# Archive Backfill
+# Keyword-by-article match counts of journaled articles, reused by later backfills.
+BACKFILL_CACHE_FILE = os.path.join(STATE_DIR, "backfill_matrix.npz")
+
+# Crawl Pipeline Configuration
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "32"))  # entries buffered between two stages
+CRAWL_DEADLINE = float(os.getenv("CRAWL_DEADLINE", "1800"))  # seconds before downloads and LLM calls are skipped
+
 # --- Keyword Definitions ---
 keyword_groups = {
     "MTFA_Main": ["MTFA", "Muslimin Trust Fund Association", "MTFA Singapore"],
@@ -70,13 +236,405 @@ POLITICAL_EXCLUSION_KEYWORDS = ["political donation", "election", "candidate", "
 CORE_RELEVANT_GROUPS = list(keyword_groups.keys())
 keywords = [kw for group in keyword_groups.values() for kw in group]
 
+# --- Feed Definitions ---
+RSS_FEEDS = [
+    "https://www.straitstimes.com/news/singapore/rss.xml",
+    "https://www.channelnewsasia.com/api/v1/rss-outbound-feed?_format=xml&category=10416",
+    "https://www.todayonline.com/feed",
+    "https://www.asiaone.com/rss/latest.xml",
+    "https://news.google.com/rss/search?q=site:beritaharian.sg",
+    "https://news.google.com/rss/search?q=site:businesstimes.com.sg+charity+OR+non-profit+OR+philanthropy",
+    "https://news.google.com/rss/search?q=site:muis.gov.sg",
+    "https://news.google.com/rss/search?q=site:msf.gov.sg+OR+%22Ministry+of+Social+and+Family+Development%22",
+    "https://news.google.com/rss?q=Muslimin+Trust+Fund+Association+Singapore",
+    "https://news.google.com/rss/search?q=%22National+Kidney+Foundation%22+NKF+Singapore",
+    "https://news.google.com/rss/search?q=%22Kidney+Dialysis+Foundation%22+KDF+Singapore",
+    "https://news.google.com/rss/search?q=%22Rahmatan+Lil+Alamin+Foundation%22+RLAF",
+    "https://news.google.com/rss/search?q=%22Association+of+Muslim+Professionals%22+AMP+Singapore",
+    "https://news.google.com/rss/search?q=%22Mendaki%22+Singapore",
+    "https://news.google.com/rss/search?q=%22Yayasan%22+Singapore+charity",
+    "https://news.google.com/rss/search?q=%22Community+Chest%22+Singapore+charity",
+    "https://news.google.com/rss/search?q=%22SG+Enable%22+Singapore+disability",
+    "https://news.google.com/rss/search?q=%22VWO%22+Singapore+charity+non-profit"
+]
+
+# --- Run Instrumentation ---
+
+class RunStats:
+    """
+    Thread-safe stage timings, counters and per-domain latencies for the run report.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = datetime.now(timezone.utc)
+        self._t0 = time.perf_counter()
+        self.stages = {}
+        self.counters = {}
+        self.domain_latency = {}
+
+    @contextmanager
+    def stage(self, name, url=None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                stage = self.stages.setdefault(name, {"calls": 0, "seconds": 0.0})
+                stage["calls"] += 1
+                stage["seconds"] += elapsed
+                if url:
+                    domain = urllib.parse.urlsplit(url).netloc.lower()
+                    self.domain_latency.setdefault(f"{name}:{domain}", []).append(elapsed)
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    @staticmethod
+    def _percentile(sorted_values, pct):
+        return sorted_values[min(len(sorted_values) - 1, int(pct / 100 * len(sorted_values)))]
+
+    def report(self):
+        with self._lock:
+            latency = {}
+            for key, values in sorted(self.domain_latency.items()):
+                values = sorted(values)
+                latency[key] = {
+                    "count": len(values),
+                    "p50": round(self._percentile(values, 50), 4),
+                    "p90": round(self._percentile(values, 90), 4),
+                    "p99": round(self._percentile(values, 99), 4),
+                    "max": round(values[-1], 4),
+                }
+            return {
+                "started_at": self.started.isoformat(),
+                "wall_seconds": round(time.perf_counter() - self._t0, 3),
+                "stages": {name: {"calls": s["calls"], "seconds": round(s["seconds"], 4)} for name, s in self.stages.items()},
+                "counters": dict(self.counters),
+                "domain_latency": latency,
+            }
+
+    def write_report(self, path=RUN_REPORT_FILE, extra=None):
+        report = self.report()
+        report.update(extra or {})
+        try:
+            save_json_state(path, report)
+            logging.info(f"Run report written to {path}.")
+        except Exception as e:
+            logging.warning(f"Could not write run report: {e}")
+        return report
+
+STATS = RunStats()
+
+# --- Keyword Matching ---
+
+def trie_regex(terms, on_terminal):
+    """
+    Builds a regex alternation for [(term, case_sensitive, value), ...] shaped like a
+    character trie, so a failing position costs a few character tests instead of one
+    per term. Longer terms are tried before their prefixes. on_terminal(value) returns
+    the regex text placed where a term ends.
+    """
+    trie = {}
+    for term, case_sensitive, value in terms:
+        node = trie
+        for ch in term:
+            node = node.setdefault((ch, case_sensitive), {})
+        node[None] = value
+
+    def emit(node):
+        parts = []
+        for key, child in node.items():
+            if key is None:
+                continue
+            ch, case_sensitive = key
+            literal = f"(?-i:{re.escape(ch)})" if case_sensitive else re.escape(ch)
+            parts.append(literal + emit(child))
+        if None in node:
+            parts.append(on_terminal(node[None]))
+        return parts[0] if len(parts) == 1 else "(?:" + "|".join(parts) + ")"
+
+    return emit(trie)
+
+class KeywordMatcher:
+    """
+    Finds every keyword, exclusion and political term in one regex pass.
+    Terms keep the same \\b word-boundary semantics as a per-term re.findall.
+    """
+
+    def __init__(self, groups, exclusion_keywords, political_keywords, core_groups=None):
+        self.core_groups = set(groups if core_groups is None else core_groups)
+        self.entries = []        # (group, kw, weight) in keyword_groups order
+        self.terms = []          # (term, case_sensitive)
+        self.term_entries = []   # term index -> entry indices
+        self.term_roles = []     # term index -> {"exclusion", "political"}
+        term_ids = {}
+
+        def add_term(term, case_sensitive):
+            key = (term, case_sensitive)
+            if key not in term_ids:
+                term_ids[key] = len(self.terms)
+                self.terms.append(key)
+                self.term_entries.append([])
+                self.term_roles.append(set())
+            return term_ids[key]
+
+        for group, group_kws in groups.items():
+            weight = 3 if ("MTFA" in group or "Ihsan" in group or "Darul" in group) else 1
+            for kw in group_kws:
+                self.term_entries[add_term(kw.lower(), False)].append(len(self.entries))
+                self.entries.append((group, kw, weight))
+        # Exclusions were always matched case-sensitively against lowercased text.
+        for ex in exclusion_keywords:
+            self.term_roles[add_term(ex, True)].add("exclusion")
+        for pk in political_keywords:
+            self.term_roles[add_term(pk.lower(), False)].add("political")
+
+        # Every term ends in its own empty group, so m.lastindex tells which term matched.
+        self._group_term = [None]
+
+        def mark_term(i):
+            self._group_term.append(i)
+            return "()"
+
+        terms = [(term, case_sensitive, i) for i, (term, case_sensitive) in enumerate(self.terms)]
+        self._pattern = re.compile(r"\b(?=" + trie_regex(terms, mark_term) + r"\b)", re.IGNORECASE)
+
+        # The regex reports one term per position; any other term matching at the same
+        # position is a prefix of it or has it as a prefix, and is checked separately.
+        lowered = [term.lower() for term, _ in self.terms]
+        by_text = {}
+        for i, term in enumerate(lowered):
+            by_text.setdefault(term, []).append(i)
+        related = [set() for _ in self.terms]
+        for i, term in enumerate(lowered):
+            for k in range(1, len(term) + 1):
+                for j in by_text.get(term[:k], ()):
+                    if j != i:
+                        related[i].add(j)
+                        related[j].add(i)
+        self._related_terms = [sorted(js) for js in related]
+        self._term_patterns = {
+            j: re.compile(rf"\b{re.escape(self.terms[j][0])}\b", 0 if self.terms[j][1] else re.IGNORECASE)
+            for j in set().union(*related)
+        }
+
+    def scan_terms(self, h_lower, t_lower):
+        """
+        Returns {term index: [headline count, text count]} for every term found in the
+        lowercased "headline text", including matches spanning the two. Counts are
+        non-overlapping matches within each part, as re.findall would count them.
+        """
+        full_text = f"{h_lower} {t_lower}"
+        h_end, t_start = len(h_lower), len(h_lower) + 1
+        found = {}
+        last_end = {}
+
+        for m in self._pattern.finditer(full_text):
+            pos = m.start()
+            term_id = self._group_term[m.lastindex]
+            hits = [(term_id, m.end(m.lastindex))]
+            for j in self._related_terms[term_id]:
+                pm = self._term_patterns[j].match(full_text, pos)
+                if pm:
+                    hits.append((j, pm.end()))
+
+            for j, end in hits:
+                counts = found.setdefault(j, [0, 0])
+                if end <= h_end:
+                    segment = 0
+                elif pos >= t_start:
+                    segment = 1
+                else:
+                    continue
+                if pos < last_end.get((j, segment), 0):
+                    continue
+                last_end[(j, segment)] = end
+                counts[segment] += 1
+
+        return found
+
+    def scan(self, h_lower, t_lower):
+        """
+        Returns (excluded, political, h_counts, t_counts) for lowercased headline and text.
+        Counts map entry index -> non-overlapping matches, as re.findall would count them.
+        """
+        excluded = political = False
+        h_counts, t_counts = {}, {}
+        for j, (h_count, t_count) in self.scan_terms(h_lower, t_lower).items():
+            roles = self.term_roles[j]
+            if roles:
+                excluded = excluded or "exclusion" in roles
+                political = political or "political" in roles
+            for entry in self.term_entries[j]:
+                if h_count:
+                    h_counts[entry] = h_counts.get(entry, 0) + h_count
+                if t_count:
+                    t_counts[entry] = t_counts.get(entry, 0) + t_count
+        return excluded, political, h_counts, t_counts
+
+    def evaluate(self, text, headline):
+        """
+        Returns (score, best_kw, best_group, vetoed) before the threshold is applied.
+        vetoed is True when an exclusion or political term rules the text out.
+        """
+        excluded, political, h_counts, t_counts = self.scan(headline.lower(), text.lower())
+        if excluded or political:
+            return 0, None, None, True
+
+        score, best_kw, best_group = 0, None, None
+        best_match_score = 0
+        for entry in sorted(set(h_counts) | set(t_counts)):
+            group, kw, weight = self.entries[entry]
+            current_score = (h_counts.get(entry, 0) * 2) + t_counts.get(entry, 0)
+            score += current_score * weight
+            if group in self.core_groups and current_score > best_match_score:
+                best_match_score = current_score
+                best_kw, best_group = kw, group
+
+        return score, best_kw, best_group, False
+
+    @staticmethod
+    def threshold(best_group):
+        is_core_group = best_group and any(k in str(best_group) for k in ["MTFA", "Ihsan", "Darul", "Competitor"])
+        return 3 if is_core_group else 5
+
+    def match(self, text, headline):
+        score, best_kw, best_group, _ = self.evaluate(text, headline)
+        return (best_kw, best_group) if score >= self.threshold(best_group) and best_kw else (None, None)
+
+KEYWORD_MATCHER = KeywordMatcher(keyword_groups, EXCLUSION_KEYWORDS, POLITICAL_EXCLUSION_KEYWORDS, CORE_RELEVANT_GROUPS)
+
+# --- Gemini Client ---
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: rate_per_minute tokens refill continuously, up to burst.
+    """
+
+    def __init__(self, rate_per_minute, burst=1):
+        self.rate = max(rate_per_minute, 0.001) / 60.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline=None):
+        """Blocks until a token is available; returns False if deadline (monotonic) comes first."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            if deadline is not None and now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+class GeminiClient:
+    """
+    Keep-alive HTTPS client for generateContent, shared by the summarization workers.
+    Each thread reuses its own connection; requests pass a token bucket, back off with
+    jitter (honouring Retry-After) on 429/5xx, and stop once the run's time budget is spent.
+    """
+
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, endpoint=GEMINI_ENDPOINT, rpm=GEMINI_RPM, time_budget=GEMINI_TIME_BUDGET, max_retries=5, timeout=GEMINI_TIMEOUT):
+        parts = urllib.parse.urlsplit(endpoint)
+        self.host, self.port = parts.hostname, parts.port
+        self._connection_class = http.client.HTTPConnection if parts.scheme == "http" else http.client.HTTPSConnection
+        self.bucket = TokenBucket(rpm, burst=max(1, GEMINI_CONCURRENCY))
+        self.time_budget = time_budget
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.requests = self.retries = 0
+        self._deadline = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _connection(self, fresh=False):
+        conn = getattr(self._local, "conn", None)
+        if fresh and conn is not None:
+            conn.close()
+            conn = None
+        if conn is None:
+            conn = self._local.conn = self._connection_class(self.host, self.port, timeout=self.timeout)
+        return conn
+
+    def _budget_deadline(self):
+        with self._lock:
+            if self._deadline is None:
+                self._deadline = time.monotonic() + self.time_budget
+            return self._deadline
+
+    def _backoff(self, attempt, retry_after=None, deadline=None):
+        try:
+            delay = float(retry_after)
+        except (TypeError, ValueError):
+            delay = random.uniform(0, min(30, 2 ** attempt))
+        with self._lock:
+            self.retries += 1
+        STATS.incr("gemini_retries")
+        if deadline is not None and time.monotonic() + delay > deadline:
+            return False
+        time.sleep(delay)
+        return True
+
+    def post(self, path, payload):
+        """Returns (status, body) of the last attempt, or None if nothing came back in time."""
+        deadline = self._budget_deadline()
+        body = json.dumps(payload)
+        last = None
+        for attempt in range(self.max_retries + 1):
+            if not self.bucket.acquire(deadline):
+                logging.warning("Gemini time budget exhausted; skipping request.")
+                return last
+            with self._lock:
+                self.requests += 1
+            STATS.incr("gemini_requests")
+            try:
+                try:
+                    conn = self._connection()
+                    conn.request("POST", path, body=body, headers={"Content-Type": "application/json"})
+                    response = conn.getresponse()
+                except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                    # The server dropped an idle keep-alive connection; reconnect once.
+                    conn = self._connection(fresh=True)
+                    conn.request("POST", path, body=body, headers={"Content-Type": "application/json"})
+                    response = conn.getresponse()
+                data = response.read().decode()
+            except Exception:
+                self._connection(fresh=True)
+                if attempt < self.max_retries and self._backoff(attempt, deadline=deadline):
+                    continue
+                return last
+
+            last = (response.status, data)
+            if response.status in self.RETRY_STATUSES and attempt < self.max_retries:
+                if self._backoff(attempt, response.getheader("Retry-After"), deadline):
+                    continue
+            return last
+        return last
+
+    def log_stats(self):
+        logging.info(f"Gemini client: {self.requests} requests, {self.retries} retries.")
+
+GEMINI_CLIENT = GeminiClient()
+
 # --- API Interaction ---
 
-def call_gemini_api(prompt):
+def call_gemini_api(prompt, generation_config=None):
     """
     Calls Gemini API with exponential backoff, search grounding, and safety settings.
+    With a generation_config (e.g. a JSON response schema) search grounding is left out,
+    since the API does not combine the two.
     """
-    host = "generativelanguage.googleapis.com"
     url = f"/v1beta/models/{GEMINI_MODEL}:generateContent?key={apiKey}"
     
     payload = {
@@ -89,96 +647,926 @@ def call_gemini_api(prompt):
             {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"}
         ]
     }
+    if generation_config:
+        del payload["tools"]
+        payload["generationConfig"] = generation_config
     
-    retries = 0
-    delays = [1, 2, 4, 8, 16]
+    with STATS.stage("gemini"):
+        response = GEMINI_CLIENT.post(url, payload)
+    if response is None:
+        return None
     
-    while retries <= 5:
+    status, data = response
+    if status == 200:
         try:
-            conn = http.client.HTTPSConnection(host)
-            headers = {"Content-Type": "application/json"}
-            conn.request("POST", url, body=json.dumps(payload), headers=headers)
-            response = conn.getresponse()
-            data = response.read().decode()
-            conn.close()
-            
-            if response.status == 200:
-                result = json.loads(data)
-                try:
-                    candidates = result.get('candidates', [])
-                    if candidates:
-                        candidate = candidates[0]
-                        if candidate.get('finishReason') == 'SAFETY':
-                            return "Summary blocked by Gemini safety filters."
-                        
-                        parts = candidate.get('content', {}).get('parts', [])
-                        if parts:
-                            return parts[0].get('text', "")
-                except Exception:
-                    return None
-            
-            if response.status in [429, 500, 502, 503, 504] and retries < 5:
-                time.sleep(delays[retries])
-                retries += 1
-            else:
-                break
+            result = json.loads(data)
+            candidates = result.get('candidates', [])
+            if candidates:
+                candidate = candidates[0]
+                if candidate.get('finishReason') == 'SAFETY':
+                    return "Summary blocked by Gemini safety filters."
+                
+                parts = candidate.get('content', {}).get('parts', [])
+                if parts:
+                    return parts[0].get('text', "")
         except Exception:
-            if retries < 5:
-                time.sleep(delays[retries])
-                retries += 1
-            else:
-                break
+            return None
                 
     return None
 
+# --- Download Pool ---
+
+class HostThrottle:
+    """
+    Limits concurrent requests per host and spaces out request starts to the same host.
+    """
+
+    def __init__(self, per_host, min_interval, jitter=0.5):
+        self.per_host = max(1, per_host)
+        self.min_interval = min_interval
+        self.jitter = jitter
+        self._lock = threading.Lock()
+        self._slots = {}
+        self._next_start = {}
+
+    @contextmanager
+    def slot(self, url):
+        host = urllib.parse.urlsplit(url).netloc.lower()
+        with self._lock:
+            semaphore = self._slots.setdefault(host, threading.BoundedSemaphore(self.per_host))
+        with semaphore:
+            with self._lock:
+                now = time.monotonic()
+                start = max(now, self._next_start.get(host, now))
+                self._next_start[host] = start + self.min_interval * random.uniform(1, 1 + self.jitter)
+            if start > now:
+                time.sleep(start - now)
+            yield
+
+DOWNLOAD_THROTTLE = HostThrottle(DOWNLOAD_PER_DOMAIN, DOWNLOAD_DOMAIN_DELAY)
+
+def download_articles(urls, workers=DOWNLOAD_WORKERS, deadline=DOWNLOAD_DEADLINE, on_done=None):
+    """
+    Downloads articles on a worker pool and returns {url: (text, top_image)}.
+    URLs not finished by the deadline map to ("", ""), so callers fall back to the RSS snippet.
+    If given, on_done(url, (text, top_image)) is called from the worker after each download attempt.
+    """
+    urls = list(dict.fromkeys(urls))
+    results = {url: ("", "") for url in urls}
+    if not urls:
+        return results
+    stop_at = time.monotonic() + deadline
+
+    def worker(url):
+        if time.monotonic() >= stop_at:
+            return "", ""
+        with DOWNLOAD_THROTTLE.slot(url):
+            if time.monotonic() >= stop_at:
+                return "", ""
+            result = fetch_full_article_content(url)
+        if on_done:
+            on_done(url, result)
+        return result
+
+    pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="download")
+    futures = {pool.submit(worker, url): url for url in urls}
+    try:
+        for future in as_completed(futures, timeout=max(0.0, stop_at - time.monotonic())):
+            results[futures[future]] = future.result()
+    except FuturesTimeoutError:
+        pending = sum(1 for future in futures if not future.done())
+        logging.warning(f"Download deadline of {deadline:.0f}s reached; {pending} articles fall back to RSS snippets.")
+        STATS.incr("article_deadline_skips", pending)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    return results
+
+# --- Feed Polling ---
+
+FEED_THROTTLE = HostThrottle(1, FEED_HOST_DELAY)
+
+def load_json_state(path, default):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+    except Exception as e:
+        logging.warning(f"Ignoring unreadable state file {path}: {e}")
+        return default
+
+def save_json_state(path, data):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+def _feed_entry_record(entry):
+    time_tuple = getattr(entry, 'published_parsed', getattr(entry, 'updated_parsed', None))
+    return {
+        "link": getattr(entry, 'link', ''),
+        "title": getattr(entry, 'title', ''),
+        "summary": getattr(entry, 'summary', ''),
+        "published_parsed": list(time_tuple) if time_tuple else None,
+    }
+
+def fetch_feed(url, cached=None):
+    """
+    Polls one feed with a conditional GET. Returns (entries, cache_record, status);
+    a 304 or a failed fetch returns the cached entries.
+    """
+    import feedparser
+
+    cached = cached or {}
+    try:
+        with FEED_THROTTLE.slot(url), STATS.stage("feed_parse", url):
+            feed = feedparser.parse(url, etag=cached.get("etag"), modified=cached.get("modified"))
+    except Exception as e:
+        logging.warning(f"Feed fetch failed for {url}: {e}")
+        STATS.incr("feed_errors")
+        return cached.get("entries", []), cached, "error"
+
+    status = feed.get("status")
+    if status == 304:
+        STATS.incr("feed_not_modified")
+        return cached.get("entries", []), cached, 304
+    if not feed.entries and (status is None or status >= 400):
+        logging.warning(f"Feed {url} returned no entries (status {status}); using cached copy.")
+        STATS.incr("feed_errors")
+        return cached.get("entries", []), cached, status or "error"
+
+    entries = [_feed_entry_record(entry) for entry in feed.entries[:FEED_ENTRY_LIMIT]]
+    record = {"etag": feed.get("etag"), "modified": feed.get("modified"), "entries": entries}
+    return entries, record, status
+
+def poll_feeds(urls, workers=FEED_WORKERS, deadline=FEED_DEADLINE, cache_file=FEED_CACHE_FILE, on_feed=None):
+    """
+    Polls all feeds concurrently and returns {url: [entry dicts]} in the order of urls.
+    ETag/Last-Modified values and parsed entries are cached on disk between runs.
+    If given, on_feed(url, entries) is called in the order of urls as soon as a feed
+    and every feed before it are done. It runs on a separate thread, so a slow callback
+    holds back neither fetching nor the deadline, which applies to fetching only.
+    """
+    cache = load_json_state(cache_file, {})
+    results = {url: cache.get(url, {}).get("entries", []) for url in urls}
+    statuses = {}
+    fetching = True
+    changed = threading.Condition()
+    release_error = None
+
+    def release():
+        nonlocal release_error
+        try:
+            for url in urls:
+                with changed:
+                    changed.wait_for(lambda: url in statuses or not fetching)
+                    entries = results[url]
+                on_feed(url, entries)
+        except Exception as e:
+            release_error = e
+
+    releaser = threading.Thread(target=release, name="feed-release", daemon=True) if on_feed else None
+    if releaser:
+        releaser.start()
+    pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="feed")
+    futures = {pool.submit(fetch_feed, url, cache.get(url)): url for url in urls}
+    try:
+        for future in as_completed(futures, timeout=deadline):
+            url = futures[future]
+            entries, record, status = future.result()
+            with changed:
+                results[url], statuses[url] = entries, status
+                if record:
+                    cache[url] = record
+                changed.notify_all()
+    except FuturesTimeoutError:
+        logging.warning(f"Feed deadline of {deadline:.0f}s reached; using cached entries for unfinished feeds.")
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+        with changed:
+            fetching = False
+            changed.notify_all()
+    if releaser:
+        releaser.join()
+
+    try:
+        save_json_state(cache_file, cache)
+    except Exception as e:
+        logging.warning(f"Could not save feed cache: {e}")
+
+    not_modified = sum(1 for status in statuses.values() if status == 304)
+    logging.info(f"Polled {len(statuses)}/{len(urls)} feeds ({not_modified} not modified).")
+    if release_error:
+        raise release_error
+    return results
+
+# --- Seen-URL Index ---
+
+class SeenIndex:
+    """
+    Local SQLite index of processed links with their published date and outcome
+    ("matched", "no_match", "pruned"), used for deduplication across runs.
+    A read_only index answers lookups but ignores add() and prune().
+    """
+
+    def __init__(self, path=SEEN_INDEX_FILE, read_only=False):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.read_only = read_only
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS seen ("
+                "link TEXT PRIMARY KEY, published TEXT, outcome TEXT, recorded_at TEXT NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS seen_recorded_at ON seen (recorded_at)")
+
+    def __contains__(self, link):
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM seen WHERE link = ?", (link,)).fetchone() is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+
+    def add(self, link, published=None, outcome="matched"):
+        self.add_many([(link, published, outcome)])
+
+    def add_many(self, rows):
+        if self.read_only:
+            return
+        recorded_at = datetime.now(timezone.utc).isoformat()
+        rows = [
+            (link, published.isoformat() if isinstance(published, datetime) else published, outcome, recorded_at)
+            for link, published, outcome in rows if link
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO seen VALUES (?, ?, ?, ?)", rows)
+
+    def prune(self, max_age_days=SEEN_RETENTION_DAYS):
+        if self.read_only:
+            return
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=max_age_days)).isoformat()
+        with self._lock, self._conn:
+            removed = self._conn.execute("DELETE FROM seen WHERE recorded_at < ?", (cutoff,)).rowcount
+        if removed:
+            logging.info(f"Pruned {removed} links older than {max_age_days} days from the seen index.")
+
+    def rebuild_from_sheet(self, sheet):
+        """Reloads the index from the Sheet's date (A) and link (F) columns."""
+        dates, links = sheet.col_values(1), sheet.col_values(6)
+        rows = [(link, dates[i] if i < len(dates) else None, "matched") for i, link in enumerate(links)]
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM seen")
+        self.add_many(rows)
+        logging.info(f"Rebuilt seen index from the Sheet with {len(rows)} links.")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+# --- Summary Cache ---
+
+class SummaryCache:
+    """
+    Disk-backed cache of Gemini summaries keyed by a hash of the model, prompt
+    template and truncated article content. Entries expire after ttl_days and the
+    least recently used ones are evicted beyond max_entries.
+    """
+
+    def __init__(self, path=SUMMARY_CACHE_FILE, ttl_days=SUMMARY_CACHE_TTL_DAYS, max_entries=SUMMARY_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_days * 86400
+        self.max_entries = max_entries
+        self.hits = self.misses = 0
+        self._memory = {}
+        self._conn = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(article_content, template=SUMMARY_PROMPT_TEMPLATE, model=GEMINI_MODEL):
+        material = json.dumps([model, template, article_content[:SUMMARY_CONTENT_CHARS]])
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _connection(self):
+        # Opened on first use so importing the module never touches the state directory.
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            with self._conn:
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS summaries ("
+                    "key TEXT PRIMARY KEY, summary TEXT NOT NULL, sentiment TEXT NOT NULL, "
+                    "created_at REAL NOT NULL, last_used REAL NOT NULL)"
+                )
+        return self._conn
+
+    def get(self, key):
+        if self.ttl_seconds <= 0:
+            return None
+        with self._lock:
+            value = self._memory.get(key)
+            if value is None:
+                try:
+                    conn = self._connection()
+                    row = conn.execute(
+                        "SELECT summary, sentiment FROM summaries WHERE key = ? AND created_at >= ?",
+                        (key, time.time() - self.ttl_seconds),
+                    ).fetchone()
+                    if row:
+                        with conn:
+                            conn.execute("UPDATE summaries SET last_used = ? WHERE key = ?", (time.time(), key))
+                        value = self._memory[key] = (row[0], row[1])
+                except sqlite3.Error as e:
+                    logging.warning(f"Summary cache read failed: {e}")
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            STATS.incr("summary_cache_misses" if value is None else "summary_cache_hits")
+            return value
+
+    def put(self, key, summary, sentiment):
+        if self.ttl_seconds <= 0:
+            return
+        now = time.time()
+        with self._lock:
+            self._memory[key] = (summary, sentiment)
+            try:
+                conn = self._connection()
+                with conn:
+                    conn.execute("INSERT OR REPLACE INTO summaries VALUES (?, ?, ?, ?, ?)", (key, summary, sentiment, now, now))
+                    conn.execute("DELETE FROM summaries WHERE created_at < ?", (now - self.ttl_seconds,))
+                    conn.execute(
+                        "DELETE FROM summaries WHERE key IN ("
+                        "SELECT key FROM summaries ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                        (self.max_entries,),
+                    )
+            except sqlite3.Error as e:
+                logging.warning(f"Summary cache write failed: {e}")
+
+    def log_stats(self):
+        logging.info(f"Summary cache: {self.hits} hits, {self.misses} misses.")
+
+SUMMARY_CACHE = SummaryCache()
+
+# --- URL Canonicalization ---
+
+GOOGLE_NEWS_ARTICLE_RE = re.compile(r"/(?:rss/)?(?:articles|read)/([A-Za-z0-9_-]+)")
+GOOGLE_NEWS_THROTTLE = HostThrottle(2, GOOGLE_NEWS_DELAY)
+
+def _is_tracking_param(pair):
+    name = urllib.parse.unquote_plus(pair.split("=", 1)[0]).lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PARAM_PREFIXES)
+
+def canonical_url(url):
+    """
+    Drops tracking parameters, the fragment, default ports and host case, so links to one
+    article from different feeds compare equal. Other parameters keep their order and encoding.
+    """
+    try:
+        parts = urllib.parse.urlsplit(url.strip())
+        host, port = parts.hostname, parts.port
+    except (ValueError, AttributeError):
+        return url
+    if parts.scheme not in ("http", "https") or not host:
+        return url
+    netloc = f"[{host}]" if ":" in host else host
+    if port and port != {"http": 80, "https": 443}[parts.scheme]:
+        netloc = f"{netloc}:{port}"
+    query = "&".join(pair for pair in parts.query.split("&") if pair and not _is_tracking_param(pair))
+    return urllib.parse.urlunsplit((parts.scheme, netloc, parts.path or "/", query, ""))
+
+def google_news_id(url):
+    """The article id of a Google News redirect link, or None for any other URL."""
+    try:
+        parts = urllib.parse.urlsplit(url)
+    except ValueError:
+        return None
+    if parts.netloc.lower() != urllib.parse.urlsplit(GOOGLE_NEWS_ENDPOINT).netloc.lower():
+        return None
+    m = GOOGLE_NEWS_ARTICLE_RE.fullmatch(parts.path)
+    return m.group(1) if m else None
+
+def decode_google_news_id(article_id):
+    """
+    Google News ids are base64 protobuf messages. Older ones embed the publisher URL as
+    field 4 and decode without a request; newer ones hold an opaque token instead (None).
+    """
+    try:
+        raw = base64.urlsafe_b64decode(article_id + "=" * (-len(article_id) % 4))
+    except ValueError:
+        return None
+    if not raw.startswith(b"\x08\x13\x22") or len(raw) < 5:
+        return None
+    length, pos = raw[3], 4
+    if length & 0x80:
+        length, pos = (length & 0x7F) | (raw[4] << 7), 5
+    url = raw[pos:pos + length].decode("utf-8", "ignore")
+    return url if url.startswith(("http://", "https://")) else None
+
+def fetch_google_news_url(link, article_id, timeout=RESOLVE_TIMEOUT):
+    """
+    Resolves a Google News link that does not embed its URL: follows the link, and if it
+    does not redirect to the publisher, asks Google's batchexecute endpoint with the
+    signature and timestamp found on the page. Returns None when neither works.
+    """
+    headers = {"User-Agent": random.choice(USER_AGENTS)}
+    with GOOGLE_NEWS_THROTTLE.slot(link):
+        with urllib.request.urlopen(urllib.request.Request(link, headers=headers), timeout=timeout) as resp:
+            final_url = resp.geturl()
+            page = resp.read(ARTICLE_MAX_BYTES).decode("utf-8", "replace")
+    if final_url != link and not google_news_id(final_url) and not (urllib.parse.urlsplit(final_url).hostname or "").endswith("google.com"):
+        return final_url
+
+    signature = re.search(r'data-n-a-sg="([^"]+)"', page)
+    timestamp = re.search(r'data-n-a-ts="(\d+)"', page)
+    if not (signature and timestamp):
+        return None
+    request = json.dumps([
+        "garturlreq",
+        [["X", "X", ["X", "X"], None, None, 1, 1, "US:en", None, 1, None, None, None, None, None, 0, 1], "X", "X", 1, [1, 1, 1], 1, 1, None, 0, 0, None, 0],
+        article_id, int(timestamp.group(1)), signature.group(1),
+    ], separators=(",", ":"))
+    body = urllib.parse.urlencode({"f.req": json.dumps([[["Fbv4je", request, None, "generic"]]])}).encode("utf-8")
+    headers["Content-Type"] = "application/x-www-form-urlencoded;charset=UTF-8"
+    endpoint = f"{GOOGLE_NEWS_ENDPOINT}/_/DotsSplashUi/data/batchexecute"
+    with GOOGLE_NEWS_THROTTLE.slot(endpoint):
+        with urllib.request.urlopen(urllib.request.Request(endpoint, data=body, headers=headers), timeout=timeout) as resp:
+            text = resp.read().decode("utf-8", "replace")
+    # The response starts with an anti-JSON-hijacking prefix line.
+    payload = json.loads(text.split("\n\n", 1)[1])
+    return json.loads(payload[0][2])[1]
+
+class UrlResolver:
+    """
+    Maps feed links to canonical article URLs: Google News links are resolved to the
+    publisher's URL and tracking parameters are stripped. Links that need a request to
+    resolve are cached in SQLite for ttl_days, so each costs its round trips only once.
+    Unresolvable Google News links are kept as they are and retried next run.
+    """
+
+    def __init__(self, path=URL_CACHE_FILE, ttl_days=URL_CACHE_TTL_DAYS, workers=RESOLVE_WORKERS, enabled=RESOLVE_GOOGLE_NEWS):
+        self.path = path
+        self.ttl_seconds = ttl_days * 86400
+        self.workers = workers
+        self.enabled = enabled
+        self.hits = self.misses = 0
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            with self._conn:
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS urls (link TEXT PRIMARY KEY, target TEXT NOT NULL, resolved_at REAL NOT NULL)"
+                )
+        return self._conn
+
+    def _lookup(self, links):
+        if not links or self.ttl_seconds <= 0:
+            return {}
+        found = {}
+        with self._lock:
+            try:
+                conn = self._connection()
+                for link in links:
+                    row = conn.execute(
+                        "SELECT target FROM urls WHERE link = ? AND resolved_at >= ?", (link, time.time() - self.ttl_seconds)
+                    ).fetchone()
+                    if row:
+                        found[link] = row[0]
+            except sqlite3.Error as e:
+                logging.warning(f"URL cache read failed: {e}")
+        return found
+
+    def _store(self, targets):
+        if not targets or self.ttl_seconds <= 0:
+            return
+        now = time.time()
+        with self._lock:
+            try:
+                conn = self._connection()
+                with conn:
+                    conn.executemany("INSERT OR REPLACE INTO urls VALUES (?, ?, ?)", [(link, target, now) for link, target in targets.items()])
+                    conn.execute("DELETE FROM urls WHERE resolved_at < ?", (now - self.ttl_seconds,))
+            except sqlite3.Error as e:
+                logging.warning(f"URL cache write failed: {e}")
+
+    def _fetch(self, link):
+        try:
+            return fetch_google_news_url(link, google_news_id(link))
+        except Exception as e:
+            logging.debug(f"Could not resolve {link}: {e}")
+            return None
+
+    def resolve_many(self, links, stop_at=None):
+        """
+        Returns {link: canonical URL} for the given feed links. Google News links still
+        unresolved at stop_at (a time.monotonic() value) keep their redirect URL.
+        """
+        links = list(dict.fromkeys(links))
+        google = [link for link in links if self.enabled and google_news_id(link)]
+        targets = self._lookup(google)
+        self.hits += len(targets)
+        STATS.incr("url_cache_hits", len(targets))
+
+        online = []
+        for link in google:
+            if link not in targets:
+                decoded = decode_google_news_id(google_news_id(link))
+                if decoded:
+                    targets[link] = decoded
+                    STATS.incr("google_news_decoded")
+                else:
+                    online.append(link)
+        if online:
+            self.misses += len(online)
+            fetched, finished = {}, 0
+            if stop_at is None or time.monotonic() < stop_at:
+                pool = ThreadPoolExecutor(max_workers=max(1, self.workers), thread_name_prefix="resolve")
+                futures = {pool.submit(self._fetch, link): link for link in online}
+                try:
+                    with STATS.stage("url_resolve"):
+                        timeout = None if stop_at is None else max(0.0, stop_at - time.monotonic())
+                        for future in as_completed(futures, timeout=timeout):
+                            finished += 1
+                            if future.result():
+                                fetched[futures[future]] = future.result()
+                except FuturesTimeoutError:
+                    logging.warning(f"Link resolution deadline reached; {len(online) - finished} Google News links keep their redirect URL.")
+                finally:
+                    pool.shutdown(wait=False, cancel_futures=True)
+            STATS.incr("google_news_fetched", len(fetched))
+            STATS.incr("google_news_unresolved", finished - len(fetched))
+            STATS.incr("google_news_deadline_skips", len(online) - finished)
+            self._store(fetched)
+            targets.update(fetched)
+        return {link: canonical_url(targets.get(link, link)) for link in links}
+
+    def log_stats(self):
+        logging.info(f"URL cache: {self.hits} hits, {self.misses} misses.")
+
+URL_RESOLVER = UrlResolver()
+
+# --- Sheet Writer ---
+
+class SheetWriter:
+    """
+    Buffers archive rows and writes them with one batched append_rows call.
+    Every row goes to an append-only spool file first and leaves it only once the
+    Sheet has accepted it, so rows from a failed flush are replayed on the next run.
+    """
+
+    def __init__(self, sheet, spool_file=SHEET_SPOOL_FILE, retries=SHEET_WRITE_RETRIES):
+        self.sheet = sheet
+        self.spool_file = spool_file
+        self.retries = retries
+        self._lock = threading.Lock()
+        self.rows = self._load_spool()
+        if self.rows:
+            logging.info(f"Replaying {len(self.rows)} spooled Sheet rows from a previous run.")
+
+    def _load_spool(self):
+        rows = []
+        try:
+            with open(self.spool_file, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rows.append(json.loads(line))
+                    except ValueError:
+                        # A run killed mid-write leaves at most one partial line.
+                        continue
+        except FileNotFoundError:
+            pass
+        return rows
+
+    def append(self, row):
+        with self._lock:
+            if row in self.rows:
+                # Already spooled by a run that stopped before journaling it.
+                return
+            os.makedirs(os.path.dirname(self.spool_file) or ".", exist_ok=True)
+            with open(self.spool_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps(row) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self.rows.append(row)
+
+    def flush(self):
+        with self._lock:
+            if not self.rows:
+                return True
+            if self.sheet is None:
+                logging.warning(f"No Sheet connection; {len(self.rows)} rows stay spooled for the next run.")
+                return False
+
+            for attempt in range(self.retries + 1):
+                try:
+                    with STATS.stage("sheets_write"):
+                        self.sheet.append_rows(self.rows)
+                except Exception as e:
+                    logging.warning(f"Sheet append_rows failed (attempt {attempt + 1}): {e}")
+                    STATS.incr("sheets_retries")
+                    if attempt < self.retries:
+                        time.sleep(2 ** attempt + random.uniform(0, 1))
+                    continue
+                logging.info(f"Wrote {len(self.rows)} rows to the Sheet.")
+                STATS.incr("sheets_rows", len(self.rows))
+                self.rows = []
+                try:
+                    os.remove(self.spool_file)
+                except FileNotFoundError:
+                    pass
+                return True
+
+            logging.error(f"Could not write {len(self.rows)} rows to the Sheet; they stay spooled for the next run.")
+            return False
+
+# --- Run Journal ---
+
+SGT = timezone(timedelta(hours=8))
+
+class RunJournal:
+    """
+    Append-only log of each entry's progress through a run ("fetched", "scored",
+    "summarized", "written"), one file per SGT run date. A restarted run reads back
+    everything since the date's last completed run and skips the work already done.
+    With journal_dir=None nothing is read or written.
+    """
+
+    def __init__(self, run_date=None, journal_dir=JOURNAL_DIR):
+        self.run_date = run_date or datetime.now(SGT).strftime("%Y-%m-%d")
+        self.journal_dir = journal_dir
+        self.path = os.path.join(journal_dir, f"{self.run_date}.jsonl") if journal_dir else None
+        self._lock = threading.Lock()
+        self._file = None
+        self.records = {}
+        if self.path:
+            self._load()
+        if self.records:
+            logging.info(f"Resuming the {self.run_date} run with {len(self.records)} journaled entries.")
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        # A run killed mid-write leaves at most one partial line.
+                        continue
+                    if event.get("stage") == "complete":
+                        self.records = {}
+                    elif event.get("link"):
+                        self._merge(event)
+        except FileNotFoundError:
+            pass
+
+    def _merge(self, event):
+        record = self.records.setdefault(event["link"], {"stages": set()})
+        record["stages"].add(event["stage"])
+        record.update((key, value) for key, value in event.items() if key not in ("link", "stage"))
+
+    def _append(self, event):
+        if self.path is None:
+            return
+        if self._file is None:
+            os.makedirs(self.journal_dir, exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(json.dumps(event) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def __contains__(self, link):
+        with self._lock:
+            return link in self.records
+
+    def get(self, link, stage):
+        """Returns the entry's journaled fields if it has reached stage, else None."""
+        with self._lock:
+            record = self.records.get(link)
+            return record if record and stage in record["stages"] else None
+
+    def record(self, link, stage, **fields):
+        event = dict(fields, link=link, stage=stage)
+        with self._lock:
+            self._append(event)
+            self._merge(event)
+
+    def record_fetch(self, entry, pub_date, text, image):
+        self.record(entry["link"], "fetched", entry=entry, published=pub_date.isoformat(), text=text, image=image)
+
+    def candidates(self, queued):
+        """(entry, pub_date) for journaled entries not already queued, in journal order."""
+        with self._lock:
+            records = [record for link, record in self.records.items() if link not in queued and "entry" in record]
+        for record in records:
+            queued.add(record["entry"]["link"])
+        return [(record["entry"], datetime.fromisoformat(record["published"])) for record in records]
+
+    def complete(self):
+        with self._lock:
+            self._append({"stage": "complete"})
+            self.records = {}
+
+    def prune(self, max_age_days=JOURNAL_RETENTION_DAYS):
+        if self.journal_dir is None:
+            return
+        cutoff = (datetime.now(SGT) - timedelta(days=max_age_days)).strftime("%Y-%m-%d")
+        try:
+            names = os.listdir(self.journal_dir)
+        except FileNotFoundError:
+            return
+        for name in names:
+            if name.endswith(".jsonl") and name[:-len(".jsonl")] < cutoff:
+                os.remove(os.path.join(self.journal_dir, name))
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
 # --- Logic Functions ---
 
+def article_selectors(article_url):
+    host = urllib.parse.urlsplit(article_url).hostname or ""
+    for domain, selectors in ARTICLE_SELECTORS.items():
+        if host == domain or host.endswith("." + domain):
+            return selectors
+    return None
+
+def read_article_html(article_url, until=None, max_bytes=ARTICLE_MAX_BYTES, timeout=20):
+    """
+    Downloads a page, stopping after the `until` marker or max_bytes. Returns (html, complete)
+    with complete False when the page was cut short.
+    """
+    request = urllib.request.Request(article_url, headers={"User-Agent": random.choice(USER_AGENTS), "Accept": "text/html"})
+    marker = until.encode("utf-8") if until else None
+    html = bytearray()
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        while len(html) < max_bytes:
+            chunk = response.read(65536)
+            if not chunk:
+                return bytes(html), True
+            html += chunk
+            if marker and html.find(marker, max(0, len(html) - len(chunk) - len(marker))) >= 0:
+                STATS.incr("article_early_stops")
+                break
+    return bytes(html), False
+
+def parse_with_selectors(html, selectors):
+    """
+    Returns (text, og_image) from the paragraphs matched by the first selectors["body"]
+    entry that finds FAST_EXTRACT_MIN_CHARS of text (else the longest text found).
+    """
+    import lxml.html
+
+    root = lxml.html.document_fromstring(html)
+    if selectors.get("drop"):
+        for node in root.cssselect(selectors["drop"]):
+            node.drop_tree()
+    body = selectors["body"]
+    text = ""
+    for selector in [body] if isinstance(body, str) else body:
+        paragraphs = (" ".join(node.text_content().split()) for node in root.cssselect(selector))
+        found = "\n\n".join(p for p in paragraphs if p)
+        if len(found) > len(text):
+            text = found
+        if len(text) >= FAST_EXTRACT_MIN_CHARS:
+            break
+    image = root.xpath("string(//meta[@property='og:image']/@content)") or root.xpath("string(//meta[@name='twitter:image']/@content)")
+    return text, image.strip()
+
+_extract_pool = None
+_extract_pool_lock = threading.Lock()
+
+def extract_pool():
+    """Process pool for parse_with_selectors, started on first use (None when disabled)."""
+    global _extract_pool
+    if EXTRACT_PROCESSES <= 0:
+        return None
+    with _extract_pool_lock:
+        if _extract_pool is None:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            # spawn, not fork: the download threads may hold locks at fork time.
+            _extract_pool = ProcessPoolExecutor(EXTRACT_PROCESSES, mp_context=multiprocessing.get_context("spawn"))
+        return _extract_pool
+
+def shutdown_extract_pool():
+    global _extract_pool
+    with _extract_pool_lock:
+        if _extract_pool is not None:
+            _extract_pool.shutdown()
+            _extract_pool = None
+
+def fetch_with_selectors(article_url, selectors):
+    """
+    Fast path for known publishers. Returns (text, top_image, html); text is empty when
+    the selectors found too little. html is the whole page for reuse by the fallback, or
+    None when the download failed or stopped early (the fallback then fetches the page).
+    """
+    try:
+        with STATS.stage("article_download", article_url):
+            html, complete = read_article_html(article_url, selectors.get("until"))
+    except Exception:
+        return "", "", None
+    STATS.incr("article_bytes", len(html))
+    try:
+        with STATS.stage("article_parse"):
+            pool = extract_pool()
+            if pool:
+                text, image = pool.submit(parse_with_selectors, html, selectors).result()
+            else:
+                text, image = parse_with_selectors(html, selectors)
+    except Exception as e:
+        logging.warning(f"Selector extraction failed for {article_url}: {e}")
+        text, image = "", ""
+    if len(text) < FAST_EXTRACT_MIN_CHARS:
+        # A page cut at the marker may hold the body after a teaser card; newspaper3k needs all of it.
+        return "", "", html if complete else None
+    return text, image, html
+
 def fetch_full_article_content(article_url):
+    html = None
+    selectors = article_selectors(article_url) if FAST_EXTRACT else None
+    if selectors:
+        text, image, html = fetch_with_selectors(article_url, selectors)
+        if text:
+            STATS.incr("article_fast_path")
+            return text, image
+        STATS.incr("article_fast_path_fallbacks")
     try:
+        from newspaper import Article, Config
+
         config = Config()
-        agents = [
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
-            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36'
-        ]
-        config.browser_user_agent = random.choice(agents)
+        config.browser_user_agent = random.choice(USER_AGENTS)
         config.request_timeout = 20
         article = Article(article_url, config=config)
-        article.download()
-        article.parse()
+        if html:
+            # Parse the page the fast path already read in full instead of fetching it again.
+            article.download(input_html=html.decode("utf-8", "replace"))
+        else:
+            with STATS.stage("article_download", article_url):
+                article.download()
+            STATS.incr("article_bytes", len(article.html or ""))
+        with STATS.stage("article_parse"):
+            article.parse()
         return article.text, article.top_image
     except Exception:
+        STATS.incr("article_failures")
         return "", ""
 
+HIGHLIGHT_TEMPLATE = "<span style='color:#006a4e; background-color:#e8f5e9; font-weight:bold; padding:0 3px; border-radius:3px;'>{}</span>"
+
+@lru_cache(maxsize=8)
+def _highlight_pattern(keywords_to_highlight):
+    # The trie alternation prefers the longest keyword at a position. Existing tags (a "<"
+    # followed by a tag name, so plain-text "<" and ">" still highlight) pass through untouched.
+    alternation = trie_regex([(kw.lower(), False, None) for kw in set(keywords_to_highlight)], lambda _: "")
+    return re.compile(rf"(</?[A-Za-z][^>]*>)|\b({alternation})\b", re.IGNORECASE)
+
+def _highlight_match(m):
+    return m.group(1) or HIGHLIGHT_TEMPLATE.format(m.group(2))
+
 def highlight_keywords(summary, keywords_to_highlight):
-    processed_summary = summary
-    for kw in sorted(keywords_to_highlight, key=len, reverse=True):
-        processed_summary = re.sub(rf"\b({re.escape(kw)})\b", r"<span style='color:#006a4e; background-color:#e8f5e9; font-weight:bold; padding:0 3px; border-radius:3px;'>\1</span>", processed_summary, flags=re.IGNORECASE)
-    return processed_summary
+    if not keywords_to_highlight:
+        return summary
+    return _highlight_pattern(tuple(keywords_to_highlight)).sub(_highlight_match, summary)
 
-def generate_summary(headline, article_content):
+def preview_summary(article_content):
     if not article_content or len(article_content.strip()) < 30:
         return "<span style='color: #7f8c8d; font-style: italic;'>Preview unavailable (content highly restricted or blocked).</span>", "NEUTRAL"
+    safe_snippet = article_content[:200].replace('\n', ' ').strip()
+    if len(article_content) > 200: safe_snippet += "..."
+    return f"<span style='color: #7f8c8d; font-style: italic;'>Preview: {safe_snippet}</span>", "NEUTRAL"
 
-    prompt = f"""You are a media intelligence analyst for a non-profit organization.
-    Analyze the following article text (which may contain a short preview snippet). 
-    Summarize its key points in under 90 words. Focus on the specific details of any mentioned campaign, event, or initiative.
-    If the text is very short, just rewrite it clearly into a complete sentence. Ignore any lingering newsletter or subscription ads.
-    
-    Article Title: {headline}
-    Article Content: {article_content[:3500]}
-    
-    Provide your response in this format:
-    [Your summary here]
-    
-    TAG: [POSITIVE], [NEUTRAL], or [NEGATIVE]"""
+def generate_summary(headline, article_content):
+    """
+    Returns (summary, sentiment, generated); generated is False when the summary is a
+    preview fallback rather than model output, so callers can avoid persisting it.
+    """
+    if not article_content or len(article_content.strip()) < 30:
+        return (*preview_summary(article_content), False)
+
+    cache_key = SummaryCache.key(article_content)
+    cached = SUMMARY_CACHE.get(cache_key)
+    if cached:
+        return (*cached, True)
+
+    prompt = SUMMARY_PROMPT_TEMPLATE.format(headline=headline, content=article_content[:SUMMARY_CONTENT_CHARS])
     
     output = call_gemini_api(prompt)
     
     # Styled Fallback Mechanism
     if not output or len(output.strip()) < 10:
-        safe_snippet = article_content[:200].replace('\n', ' ').strip()
-        if len(article_content) > 200: safe_snippet += "..."
-        return f"<span style='color: #7f8c8d; font-style: italic;'>Preview: {safe_snippet}</span>", "NEUTRAL"
+        return (*preview_summary(article_content), False)
         
     sentiment = "NEUTRAL"
     if "TAG: [POSITIVE]" in output.upper() or "[POSITIVE]" in output.upper(): sentiment = "POSITIVE"
@@ -187,42 +1575,746 @@ def generate_summary(headline, article_content):
     clean_summary = re.sub(r'TAG:\s*\[.*?\]', '', output, flags=re.IGNORECASE)
     clean_summary = re.sub(r'\[.*?\]', '', clean_summary).strip()
     
-    return clean_summary, sentiment
+    SUMMARY_CACHE.put(cache_key, clean_summary, sentiment)
+    return clean_summary, sentiment, True
+
+def parse_batch_summaries(output, count):
+    """
+    Validates a batch reply and returns {index: (summary, sentiment)} for the usable items.
+    """
+    if not output:
+        return {}
+    text = re.sub(r'^```(?:json)?\s*|\s*```$', '', output.strip())
+    try:
+        items = json.loads(text)
+    except ValueError:
+        logging.warning("Batch summary reply was not valid JSON.")
+        return {}
+    if not isinstance(items, list):
+        return {}
+
+    results = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        idx, summary, sentiment = item.get("id"), item.get("summary"), item.get("sentiment")
+        if not isinstance(idx, int) or not 0 <= idx < count or idx in results:
+            continue
+        if not isinstance(summary, str) or len(summary.strip()) < 10:
+            continue
+        sentiment = str(sentiment).strip(" []").upper()
+        if sentiment not in ("POSITIVE", "NEUTRAL", "NEGATIVE"):
+            continue
+        results[idx] = (re.sub(r'\[.*?\]', '', summary).strip(), sentiment)
+    return results
+
+def generate_summaries(items, batch_size=SUMMARY_BATCH_SIZE, workers=GEMINI_CONCURRENCY):
+    """
+    Summarizes [(headline, article_content), ...] and returns [(summary, sentiment, generated), ...]
+    in order, with generated as in generate_summary.
+    Requests run on `workers` threads. With batch_size > 1, uncached articles are sent
+    batch_size at a time as one structured request; any item the reply does not cover
+    falls back to generate_summary.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="gemini") as pool:
+        if batch_size <= 1:
+            return list(pool.map(lambda item: generate_summary(*item), items))
+        return _generate_batched_summaries(items, batch_size, pool)
+
+def _generate_batched_summaries(items, batch_size, pool):
+    results = [None] * len(items)
+    pending = []
+    for i, (headline, content) in enumerate(items):
+        if not content or len(content.strip()) < 30:
+            results[i] = generate_summary(headline, content)
+            continue
+        cache_key = SummaryCache.key(content, SUMMARY_BATCH_PROMPT_TEMPLATE)
+        cached = SUMMARY_CACHE.get(cache_key)
+        if cached:
+            results[i] = (*cached, True)
+        else:
+            pending.append((i, cache_key))
+
+    def summarize_batch(batch):
+        articles = "\n\n".join(
+            f"Article {n}:\nTitle: {items[i][0]}\nContent: {items[i][1][:SUMMARY_CONTENT_CHARS]}"
+            for n, (i, _) in enumerate(batch)
+        )
+        prompt = SUMMARY_BATCH_PROMPT_TEMPLATE.format(count=len(batch), articles=articles)
+        output = call_gemini_api(prompt, {"responseMimeType": "application/json", "responseSchema": SUMMARY_BATCH_SCHEMA})
+        parsed = parse_batch_summaries(output, len(batch))
+        if len(parsed) < len(batch):
+            logging.warning(f"Batch summary covered {len(parsed)}/{len(batch)} articles; retrying the rest one by one.")
+
+        for n, (i, cache_key) in enumerate(batch):
+            if n in parsed:
+                results[i] = (*parsed[n], True)
+                SUMMARY_CACHE.put(cache_key, *parsed[n])
+            else:
+                results[i] = generate_summary(*items[i])
+
+    batches = [pending[start:start + batch_size] for start in range(0, len(pending), batch_size)]
+    list(pool.map(summarize_batch, batches))
+    return results
 
 def contains_keywords(text, headline):
-    score, best_kw, best_group = 0, None, None
-    best_match_score = 0
-    h_lower, t_lower = headline.lower(), text.lower()
-    full_text_lower = f"{h_lower} {t_lower}"
-
-    if any(re.search(rf"\b{re.escape(ex)}\b", full_text_lower) for ex in EXCLUSION_KEYWORDS):
-        return None, None
-
-    for group, group_kws in keyword_groups.items():
-        for kw in group_kws:
-            kw_l = kw.lower()
-            h_count = len(re.findall(rf"\b{re.escape(kw_l)}\b", h_lower, re.IGNORECASE))
-            t_count = len(re.findall(rf"\b{re.escape(kw_l)}\b", t_lower, re.IGNORECASE))
-            current_score = (h_count * 2) + t_count
-            
-            if current_score > 0:
-                is_political = any(re.search(rf"\b{re.escape(pk.lower())}\b", full_text_lower, re.IGNORECASE) for pk in POLITICAL_EXCLUSION_KEYWORDS)
-                if not is_political:
-                    is_mtfa_group = "MTFA" in group or "Ihsan" in group or "Darul" in group
-                    score += (current_score * 3) if is_mtfa_group else current_score
-                    
-                    if group in CORE_RELEVANT_GROUPS and current_score > best_match_score:
-                        best_match_score = current_score
-                        best_kw, best_group = kw, group
-
-    is_core_group = best_group and any(k in str(best_group) for k in ["MTFA", "Ihsan", "Darul", "Competitor"])
-    final_threshold = 3 if is_core_group else 5
+    with STATS.stage("keyword_match"):
+        return KEYWORD_MATCHER.match(text, headline)
+
+def clean_rss_summary(rss_summary_raw):
+    return re.sub(r'<[^>]+>', '', rss_summary_raw or '').strip()
+
+def snippet_text(rss_summary):
+    """The RSS snippet as article_text puts it in front of a downloaded article."""
+    return f"RSS Snippet: {rss_summary}"
+
+def triage_entry(title, rss_summary, pruning=RELEVANCE_PRUNING):
+    """
+    Scores an entry's RSS title and summary with the keyword model before any download.
+    Returns (verdict, reason): "relevant" when the metadata alone reaches the threshold,
+    "possible" when the full text could still decide it, "prune" when it is not worth fetching.
+    """
+    # Scored in the shape article_text gives it, so no term spans the title and snippet.
+    score, best_kw, best_group, vetoed = KEYWORD_MATCHER.evaluate(snippet_text(rss_summary), title)
+    if vetoed:
+        # The title and RSS snippet are usually part of the final text, so the veto still
+        # applies; audited veto prunes measure the cases where the snippet is left out.
+        return ("prune", "veto") if pruning in ("safe", "aggressive") else ("possible", "veto")
+    if best_kw and score >= KEYWORD_MATCHER.threshold(best_group):
+        return "relevant", "metadata"
+    if score == 0:
+        return ("prune", "no_hits") if pruning == "aggressive" else ("possible", "no_hits")
+    return "possible", "partial"
+
+def log_prefilter_report(triage, audit_hits):
+    """audit_hits maps a prune reason to the number of audited entries with that reason that matched."""
+    verdicts = {}
+    for verdict, reason in triage.values():
+        verdicts[f"{verdict}/{reason}"] = verdicts.get(f"{verdict}/{reason}", 0) + 1
+    avoided = sum(1 for verdict, _ in triage.values() if verdict == "prune")
+    audited = found = 0
+    estimated_lost = 0.0
+    for reason in ("veto", "no_hits"):
+        sampled, hits = verdicts.get(f"audit/{reason}", 0), audit_hits.get(reason, 0)
+        audited += sampled
+        found += hits
+        if sampled:
+            estimated_lost += hits / sampled * verdicts.get(f"prune/{reason}", 0)
+    logging.info(
+        f"Relevance prefilter ({RELEVANCE_PRUNING}): {len(triage)} entries {verdicts}; "
+        f"downloads avoided {avoided}; audit found {found}/{audited} hits, "
+        f"est. hits lost {estimated_lost:.1f}"
+    )
+
+# --- Story Clustering ---
+
+def simhash(text, shingle_size=3):
+    """64-bit SimHash over the word shingles of text, ignoring case and punctuation."""
+    words = re.findall(r"\w+", text.lower())
+    shingles = {" ".join(words[i:i + shingle_size]) for i in range(max(1, len(words) - shingle_size + 1))}
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big") for s in shingles]
+    half = len(hashes) / 2
+    fingerprint = 0
+    for bit in range(64):
+        mask = 1 << bit
+        if sum(1 for h in hashes if h & mask) > half:
+            fingerprint |= mask
+    return fingerprint
+
+class StoryClusterer:
+    """
+    Groups near-duplicate articles as they are added. An article joins the earliest cluster
+    whose representative is within max_distance bits of its SimHash, otherwise it starts a
+    new cluster, so the result depends only on the order of add() calls.
+    """
+
+    def __init__(self, max_distance=CLUSTER_MAX_DISTANCE, min_words=CLUSTER_MIN_WORDS):
+        self.max_distance = max_distance
+        self.min_words = min_words
+        # Fingerprints within max_distance bits agree on at least one of max_distance + 1
+        # bands, so only representatives sharing a band need comparing.
+        self._bands = max(1, max_distance + 1)
+        self._width = -(-64 // self._bands)
+        self._index = [{} for _ in range(self._bands)]
+        self._count = 0
+
+    def add(self, key, text):
+        """Returns the key of the article's cluster representative (key itself for a new cluster)."""
+        if self.max_distance < 0 or len(text.split()) < self.min_words:
+            return key
+        fingerprint = simhash(text)
+        bands = [(fingerprint >> (b * self._width)) & ((1 << self._width) - 1) for b in range(self._bands)]
+        best = None
+        for b, value in enumerate(bands):
+            for other, rep_key, seq in self._index[b].get(value, ()):
+                if bin(fingerprint ^ other).count("1") <= self.max_distance and (best is None or seq < best[0]):
+                    best = (seq, rep_key)
+        if best:
+            STATS.incr("cluster_duplicates")
+            return best[1]
+        for b, value in enumerate(bands):
+            self._index[b].setdefault(value, []).append((fingerprint, key, self._count))
+        self._count += 1
+        return key
+
+def fill_cluster_summaries(matches):
+    """Gives every cluster member its representative's summary and sentiment."""
+    summaries = {entry["link"]: (summary, sentiment) for entry, _, _, _, _, summary, sentiment, rep in matches if entry["link"] == rep}
+    return [
+        (entry, pub_date, image, kw, group, *summaries[rep], rep)
+        for entry, pub_date, image, kw, group, _, _, rep in matches
+    ]
+
+# --- Crawl Stages ---
+
+JUNK_PHRASE_RE = re.compile(re.escape("Sign up now: Get ST's newsletters delivered to your inbox"), re.IGNORECASE)
+
+def audit_sample(link, rate=RELEVANCE_AUDIT_RATE):
+    # Sampled by hash rather than random() so both crawl modes audit the same entries.
+    digest = hashlib.sha256(link.encode("utf-8")).digest()
+    return int.from_bytes(digest[:4], "big") < rate * 2 ** 32
+
+def recent_entries(entries, limit):
+    """(entry, pub_date) for the entries published after limit."""
+    recent = []
+    for entry in entries:
+        try:
+            time_tuple = entry["published_parsed"]
+            if time_tuple:
+                pub_date = datetime(*time_tuple[:6]).replace(tzinfo=timezone.utc)
+                if pub_date < limit: continue
+            else:
+                continue
+        except: continue
+        recent.append((entry, pub_date))
+    return recent
+
+def select_candidates(recent, links, seen, queued, journal):
+    """
+    Yields (entry, pub_date) for recent entries whose canonical link (links maps feed links
+    to them) is not already queued in this run, and not in the seen index unless journaled
+    today. Yielded entries are copies with the canonical link and the feed's own as "feed_link".
+    """
+    for entry, pub_date in recent:
+        link = links[entry["link"]]
+        if link in queued:
+            if link != entry["link"]:
+                STATS.incr("canonical_duplicates")
+            continue
+        # Links recorded before canonicalization are still checked as the feed gave them.
+        if (link in seen or (link != entry["link"] and entry["link"] in seen)) and link not in journal: continue
+        
+        queued.add(link)
+        yield dict(entry, link=link, feed_link=entry["link"]), pub_date
+
+def triage_candidate(entry):
+    verdict, reason = triage_entry(entry["title"], clean_rss_summary(entry["summary"]))
+    if verdict == "prune" and audit_sample(entry["link"]):
+        verdict = "audit"
+    return verdict, reason
+
+def article_text(entry, fetched_content):
+    """The text an entry is scored and summarized on, from its cleaned download and RSS snippet."""
+    rss_summary = clean_rss_summary(entry["summary"])
+    
+    if len(fetched_content) > 100:
+        return f"{snippet_text(rss_summary)}\n\nFull Text: {fetched_content}"
+    return rss_summary if len(rss_summary) > len(fetched_content) else fetched_content
+
+def score_candidate(entry, pub_date, verdict, fetched_content, seen, journal):
+    """
+    Builds the text to match from the downloaded article and the RSS snippet, scores it
+    and records the outcome in seen. Returns (final_content, kw, group); a score
+    journaled earlier today is reused.
+    """
+    fetched_content = JUNK_PHRASE_RE.sub("", fetched_content).strip()
+    final_content = article_text(entry, fetched_content)
     
-    return (best_kw, best_group) if score >= final_threshold and best_kw else (None, None)
+    # A score is only final once the download it is based on is; skipped downloads are retried.
+    fetched = journal.get(entry["link"], "fetched")
+    scored = journal.get(entry["link"], "scored") if fetched else None
+    if scored:
+        kw, group = scored["kw"], scored["group"]
+    else:
+        kw, group = contains_keywords(final_content, entry["title"])
+        if fetched:
+            journal.record(entry["link"], "scored", kw=kw, group=group)
+    if kw:
+        seen.add(entry["link"], pub_date, "matched")
+    elif verdict == "prune":
+        seen.add(entry["link"], pub_date, "pruned")
+    elif fetched_content:
+        # Failed downloads stay unrecorded so the next run can retry them.
+        seen.add(entry["link"], pub_date, "no_match")
+    return final_content, kw, group
+
+def crawl_sequential(feeds, seen, limit, journal):
+    """
+    Polls every feed, then downloads, scores and summarizes, each stage finishing
+    before the next starts. Returns (triage, matches) with triage as {link: (verdict, reason)}
+    and matches as [(entry, pub_date, image, kw, group, summary, sentiment, rep_link)] in
+    feed order, followed by entries known only from today's journal. rep_link is the link
+    of the entry's near-duplicate cluster representative, whose summary it shares.
+    """
+    with STATS.stage("feeds"):
+        feed_entries = poll_feeds(feeds)
+
+    queued = set()
+    recent = {url: recent_entries(feed_entries[url], limit) for url in feeds}
+    links = URL_RESOLVER.resolve_many(
+        [entry["link"] for url in feeds for entry, _ in recent[url]], time.monotonic() + RESOLVE_DEADLINE,
+    )
+    candidates = [candidate for url in feeds for candidate in select_candidates(recent[url], links, seen, queued, journal)]
+    candidates += journal.candidates(queued)
+    triage = {entry["link"]: triage_candidate(entry) for entry, _ in candidates}
+
+    by_link = {entry["link"]: (entry, pub_date) for entry, pub_date in candidates}
+    downloads = {}
+    for entry, pub_date in candidates:
+        fetched = journal.get(entry["link"], "fetched")
+        if fetched:
+            downloads[entry["link"]] = (fetched["text"], fetched["image"])
+        elif triage[entry["link"]][0] == "prune":
+            journal.record_fetch(entry, pub_date, "", "")
+
+    with STATS.stage("downloads"):
+        downloads.update(download_articles(
+            [link for link, (verdict, _) in triage.items() if verdict != "prune" and link not in downloads],
+            on_done=lambda url, result: journal.record_fetch(*by_link[url], *result),
+        ))
+    logging.info(f"Downloaded {sum(1 for text, _ in downloads.values() if text)}/{len(downloads)} articles.")
+
+    matches = []
+    clusterer = StoryClusterer()
+    for entry, pub_date in candidates:
+        fetched_content, image = downloads.get(entry["link"], ("", ""))
+        final_content, kw, group = score_candidate(entry, pub_date, triage[entry["link"]][0], fetched_content, seen, journal)
+        if kw:
+            rep = clusterer.add(entry["link"], fetched_content or final_content)
+            matches.append((entry, pub_date, final_content, image, kw, group, rep))
+
+    summaries = {}
+    for entry, _, _, _, _, _, rep in matches:
+        summarized = journal.get(entry["link"], "summarized")
+        if summarized and rep == entry["link"]:
+            summaries[entry["link"]] = (summarized["summary"], summarized["sentiment"])
+    pending = [match for match in matches if match[6] == match[0]["link"] and match[0]["link"] not in summaries]
+    with STATS.stage("summaries"):
+        results = generate_summaries([(entry["title"], final_content) for entry, _, final_content, _, _, _, _ in pending])
+    for (entry, _, _, _, _, _, _), (summary, sentiment, generated) in zip(pending, results):
+        # Previews are not journaled, so a resumed run still asks Gemini.
+        if generated:
+            journal.record(entry["link"], "summarized", summary=summary, sentiment=sentiment)
+        summaries[entry["link"]] = (summary, sentiment)
+
+    return triage, fill_cluster_summaries([
+        (entry, pub_date, image, kw, group, *summaries.get(entry["link"], (None, None)), rep)
+        for entry, pub_date, _, image, kw, group, rep in matches
+    ])
+
+_DONE = object()
+
+def run_stage(name, inbox, outbox, handle, workers=1, batch=1, flush=None, wait=0.0, stop_at=None):
+    """
+    Starts worker threads that take up to batch items at a time from inbox and put
+    whatever handle(items) yields on outbox. After its first item a worker waits up to
+    wait seconds (never past stop_at) for the batch to fill; one worker fills at a time,
+    so idle workers do not split a batch between them. _DONE marks the end of input; the
+    last worker to finish puts whatever flush() yields, then passes _DONE on to outbox.
+    """
+    remaining = workers
+    lock = threading.Lock()
+    filling = threading.Lock()
+
+    def worker():
+        nonlocal remaining
+        try:
+            done = False
+            while not done:
+                with filling:
+                    items = [inbox.get()]
+                    fill_until = time.monotonic() + wait
+                    if stop_at is not None:
+                        fill_until = min(fill_until, stop_at)
+                    while len(items) < batch and items[-1] is not _DONE:
+                        try:
+                            items.append(inbox.get(timeout=max(0.0, fill_until - time.monotonic())))
+                        except queue.Empty:
+                            break
+                if items[-1] is _DONE:
+                    items.pop()
+                    inbox.put(_DONE)  # for the other workers of this stage
+                    done = True
+                if not items:
+                    continue
+                try:
+                    for result in handle(items):
+                        outbox.put(result)
+                except Exception as e:
+                    logging.error(f"Pipeline stage {name} dropped {len(items)} entries: {e}")
+                    STATS.incr("pipeline_errors", len(items))
+        finally:
+            with lock:
+                remaining -= 1
+                last = remaining == 0
+            if last:
+                try:
+                    for result in (flush() if flush else ()):
+                        outbox.put(result)
+                except Exception as e:
+                    logging.error(f"Pipeline stage {name} failed to flush: {e}")
+                outbox.put(_DONE)
+
+    for i in range(workers):
+        threading.Thread(target=worker, name=f"{name}-{i}", daemon=True).start()
+
+def crawl_pipeline(feeds, seen, limit, journal, deadline=CRAWL_DEADLINE, queue_size=PIPELINE_QUEUE_SIZE):
+    """
+    Streams entries from feed polling through link resolution, downloading, scoring and
+    summarization over bounded queues, so LLM calls overlap with downloads and a full
+    queue holds back the stage feeding it. Link resolution has its own RESOLVE_DEADLINE;
+    links unresolved by then keep their Google News URL. Downloads stop at DOWNLOAD_DEADLINE
+    and LLM calls at the crawl deadline; the remaining entries drain with RSS snippets and
+    previews. In batch mode the summarize stage collects up to SUMMARY_BATCH_SIZE articles,
+    waiting at most SUMMARY_BATCH_WAIT for a batch to fill.
+    Returns the same (triage, matches) as crawl_sequential.
+    """
+    stop_at = time.monotonic() + deadline
+    resolve_stop = time.monotonic() + min(RESOLVE_DEADLINE, deadline)
+    download_stop = time.monotonic() + min(DOWNLOAD_DEADLINE, deadline)
+    to_resolve, to_download, to_score, to_summarize, results = (queue.Queue(queue_size) for _ in range(5))
+    triage = {}
+    queued = set()
+    downloaded = attempted = 0
+
+    def expired(until=stop_at):
+        return time.monotonic() >= until
+
+    def number(candidates):
+        for entry, pub_date in candidates:
+            triage[entry["link"]] = triage_candidate(entry)
+            yield len(triage), entry, pub_date
+
+    def poll():
+        try:
+            with STATS.stage("feeds"):
+                poll_feeds(
+                    feeds, deadline=min(FEED_DEADLINE, deadline),
+                    on_feed=lambda url, entries: to_resolve.put(recent_entries(entries, limit)),
+                )
+        except Exception as e:
+            logging.error(f"Feed polling failed: {e}")
+        finally:
+            to_resolve.put(_DONE)
+
+    def resolve(batches):
+        # One feed at a time, in feed order, so candidates are numbered as in crawl_sequential.
+        for recent in batches:
+            links = URL_RESOLVER.resolve_many([entry["link"] for entry, _ in recent], resolve_stop)
+            yield from number(select_candidates(recent, links, seen, queued, journal))
+
+    def download(items):
+        for order, entry, pub_date in items:
+            fetched_content, image = "", ""
+            fetched = journal.get(entry["link"], "fetched")
+            if fetched:
+                fetched_content, image = fetched["text"], fetched["image"]
+            elif triage[entry["link"]][0] == "prune":
+                journal.record_fetch(entry, pub_date, "", "")
+            elif expired(download_stop):
+                STATS.incr("article_deadline_skips")
+            else:
+                with DOWNLOAD_THROTTLE.slot(entry["link"]):
+                    attempt = not expired(download_stop)
+                    if attempt:
+                        fetched_content, image = fetch_full_article_content(entry["link"])
+                if attempt:
+                    journal.record_fetch(entry, pub_date, fetched_content, image)
+                else:
+                    STATS.incr("article_deadline_skips")
+            yield order, entry, pub_date, fetched_content, image
+
+    # Downloads finish out of order; scoring in candidate order keeps the clusters, and so
+    # the results, identical to crawl_sequential.
+    clusterer = StoryClusterer()
+    held = {}
+    next_order = 1
+
+    def score_in_order(item):
+        nonlocal downloaded, attempted
+        order, entry, pub_date, fetched_content, image = item
+        verdict = triage[entry["link"]][0]
+        if verdict != "prune":
+            attempted += 1
+            downloaded += bool(fetched_content)
+        final_content, kw, group = score_candidate(entry, pub_date, verdict, fetched_content, seen, journal)
+        if kw:
+            rep = clusterer.add(entry["link"], fetched_content or final_content)
+            yield order, entry, pub_date, final_content, image, kw, group, rep
+
+    def score(items):
+        nonlocal next_order
+        for item in items:
+            held[item[0]] = item
+        while next_order in held:
+            yield from score_in_order(held.pop(next_order))
+            next_order += 1
+
+    def flush_held():
+        # Only reached with gaps when an upstream stage dropped entries.
+        for order in sorted(held):
+            yield from score_in_order(held.pop(order))
+
+    def summarize(items):
+        pending = []
+        for item in items:
+            order, entry, pub_date, _, image, kw, group, rep = item
+            summarized = journal.get(entry["link"], "summarized")
+            if rep != entry["link"]:
+                # Cluster members take the representative's summary once all results are in.
+                yield order, (entry, pub_date, image, kw, group, None, None, rep)
+            elif summarized:
+                yield order, (entry, pub_date, image, kw, group, summarized["summary"], summarized["sentiment"], rep)
+            else:
+                pending.append(item)
+        if not pending:
+            return
+
+        texts = [(entry["title"], final_content) for _, entry, _, final_content, _, _, _, _ in pending]
+        if expired():
+            STATS.incr("summary_deadline_skips", len(pending))
+            summaries = [(*preview_summary(content), False) for _, content in texts]
+        else:
+            summaries = [generate_summary(*texts[0])] if len(texts) == 1 else generate_summaries(texts, workers=1)
+        for (order, entry, pub_date, _, image, kw, group, rep), (summary, sentiment, generated) in zip(pending, summaries):
+            # Previews are not journaled, so a resumed run still asks Gemini.
+            if generated:
+                journal.record(entry["link"], "summarized", summary=summary, sentiment=sentiment)
+            yield order, (entry, pub_date, image, kw, group, summary, sentiment, rep)
+
+    with STATS.stage("pipeline"):
+        threading.Thread(target=poll, name="feeds", daemon=True).start()
+        run_stage("resolve", to_resolve, to_download, resolve, flush=lambda: number(journal.candidates(queued)))
+        run_stage("download", to_download, to_score, download, DOWNLOAD_WORKERS)
+        run_stage("score", to_score, to_summarize, score, flush=flush_held)
+        run_stage(
+            "summarize", to_summarize, results, summarize, GEMINI_CONCURRENCY, max(1, SUMMARY_BATCH_SIZE),
+            wait=SUMMARY_BATCH_WAIT if SUMMARY_BATCH_SIZE > 1 else 0.0, stop_at=stop_at,
+        )
+
+        matches = []
+        while True:
+            item = results.get()
+            if item is _DONE:
+                break
+            matches.append(item)
+
+    logging.info(f"Downloaded {downloaded}/{attempted} articles.")
+    if expired():
+        logging.warning(f"Crawl deadline of {deadline:.0f}s reached; late entries used RSS snippets and previews.")
+    matches.sort(key=lambda item: item[0])
+    return triage, fill_cluster_summaries([match for _, match in matches])
+
+# --- Archive Backfill ---
+
+def load_archive(paths):
+    """
+    Reads run journals (files, or directories searched recursively such as a download of
+    the crawl-journal-* artifacts) and returns [(link, headline, text, kw, group)] for
+    every entry that was fetched and scored, with text rebuilt as score_candidate built it
+    and (kw, group) as last recorded. Journals found in directories are read by run date.
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            found = [os.path.join(root, name) for root, _, names in os.walk(path) for name in names if name.endswith(".jsonl")]
+            files += sorted(found, key=lambda name: (os.path.basename(name), name))
+        else:
+            files.append(path)
+
+    fetched, scored = {}, {}
+    for path in files:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                if event.get("stage") == "fetched":
+                    fetched[event["link"]] = event
+                elif event.get("stage") == "scored":
+                    scored[event["link"]] = (event.get("kw"), event.get("group"))
+
+    archive = []
+    for link, (kw, group) in scored.items():
+        if link in fetched:
+            entry = fetched[link]["entry"]
+            text = article_text(entry, JUNK_PHRASE_RE.sub("", fetched[link]["text"]).strip())
+            archive.append((link, entry["title"], text, kw, group))
+    return archive
+
+class ArchiveMatrix:
+    """
+    Sparse term-by-article match counts for a list of (headline, text): per term, the
+    headline and text counts KeywordMatcher.scan_terms reports and whether it was found at
+    all. Counts are cached per article and term in cache_file, so a later backfill only
+    scans new articles, and old ones only for terms it has not counted before.
+    """
+
+    def __init__(self, docs, cache_file=BACKFILL_CACHE_FILE):
+        self.docs = docs
+        self.cache_file = cache_file
+        self.keys = [hashlib.sha256(json.dumps(doc).encode("utf-8")).hexdigest() for doc in docs]
+        self.terms = []          # (term, case_sensitive) per column
+        self.hits = []           # (row, column, headline count, text count)
+        self.unscanned = list(range(len(docs)))  # rows not yet counted for self.terms
+        self.scanned = set()     # rows scanned by this instance
+        self._load()
+
+    def _load(self):
+        import numpy as np
+
+        try:
+            cached = np.load(self.cache_file, allow_pickle=False)
+            terms = [tuple(term) for term in json.loads(str(cached["terms"]))]
+            cached_keys = cached["keys"]
+            row, col, h_count, t_count = (cached[name] for name in ("row", "col", "h", "t"))
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable backfill cache {self.cache_file}: {e}")
+            return
+
+        rows = {}
+        for i, key in enumerate(self.keys):
+            rows.setdefault(key, []).append(i)
+        # A cached row maps to every current article with its content (once, however often
+        # the content was cached); dropped articles vanish.
+        targets = [rows.pop(str(key), ()) for key in cached_keys]
+        self.terms = terms
+        self.hits = [
+            (i, c, h, t)
+            for r, c, h, t in zip(row.tolist(), col.tolist(), h_count.tolist(), t_count.tolist())
+            for i in targets[r]
+        ]
+        cached_rows = {i for rows_of_key in targets for i in rows_of_key}
+        self.unscanned = [i for i in range(len(self.docs)) if i not in cached_rows]
+
+    def _scan(self, rows, terms):
+        if not rows or not terms:
+            return
+        matcher = KeywordMatcher(
+            {"backfill": [term for term, case_sensitive in terms if not case_sensitive]},
+            [term for term, case_sensitive in terms if case_sensitive], [],
+        )
+        columns = {term: i for i, term in enumerate(self.terms)}
+        column_of = [columns[term] for term in matcher.terms]
+        for row in rows:
+            headline, text = self.docs[row]
+            for j, (h_count, t_count) in matcher.scan_terms(headline.lower(), text.lower()).items():
+                self.hits.append((row, column_of[j], h_count, t_count))
+        self.scanned.update(rows)
+
+    def counts(self, terms):
+        """
+        Returns (headline counts, text counts, found) as CSR matrices with one row per
+        article and one column per term, scanning for whatever is not counted yet.
+        """
+        import numpy as np
+        from scipy import sparse
+
+        known_terms = set(self.terms)
+        new_terms = [term for term in dict.fromkeys(terms) if term not in known_terms]
+        unscanned = set(self.unscanned)
+        self.terms += new_terms
+        self._scan(self.unscanned, self.terms)
+        self._scan([i for i in range(len(self.docs)) if i not in unscanned], new_terms)
+        self.unscanned = []
+
+        columns = {term: i for i, term in enumerate(self.terms)}
+        hits = np.array(self.hits, dtype=np.int64).reshape(-1, 4)
+        shape = (len(self.docs), len(self.terms))
+        row, col = hits[:, 0], hits[:, 1]
+        h_count = sparse.csr_matrix((hits[:, 2], (row, col)), shape=shape)
+        t_count = sparse.csr_matrix((hits[:, 3], (row, col)), shape=shape)
+        found = sparse.csr_matrix((np.ones(len(hits), dtype=bool), (row, col)), shape=shape)
+        pick = [columns[term] for term in terms]
+        return h_count[:, pick].tocsr(), t_count[:, pick].tocsr(), found[:, pick].tocsr()
+
+    def save(self):
+        import numpy as np
+
+        os.makedirs(os.path.dirname(self.cache_file) or ".", exist_ok=True)
+        hits = np.array(self.hits, dtype=np.int64).reshape(-1, 4)
+        tmp_path = f"{self.cache_file}.tmp.npz"
+        np.savez_compressed(
+            tmp_path, terms=np.array(json.dumps(self.terms)), keys=np.array(self.keys, dtype="U64"),
+            row=hits[:, 0], col=hits[:, 1], h=hits[:, 2], t=hits[:, 3],
+        )
+        os.replace(tmp_path, self.cache_file)
+
+def _first_row_max(matrix):
+    """Column of each row's first largest stored value (-1 for rows without any), as a loop with > would pick."""
+    import numpy as np
+
+    matrix = matrix.tocsr()
+    matrix.eliminate_zeros()
+    matrix.sort_indices()
+    rows = np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr))
+    row_max = np.zeros(matrix.shape[0], dtype=matrix.data.dtype)
+    np.maximum.at(row_max, rows, matrix.data)
+    at_max = np.flatnonzero(matrix.data == row_max[rows])
+    max_rows, first = np.unique(rows[at_max], return_index=True)
+    best = np.full(matrix.shape[0], -1, dtype=np.int64)
+    best[max_rows] = matrix.indices[at_max[first]]
+    return best
+
+def classify_archive(archive, matcher=KEYWORD_MATCHER):
+    """
+    Applies matcher's rules (group weights, exclusion and political vetoes, best keyword
+    and threshold) to every article of an ArchiveMatrix with array operations. Returns
+    [(kw, group)] per article, the same as matcher.match (contains_keywords) gives.
+    """
+    import numpy as np
+
+    entry_terms = [(kw.lower(), False) for _, kw, _ in matcher.entries]
+    veto_terms = [term for term, roles in zip(matcher.terms, matcher.term_roles) if roles]
+    h_count, t_count, found = archive.counts(entry_terms + veto_terms)
+    k = len(entry_terms)
+
+    current = (2 * h_count[:, :k] + t_count[:, :k]).tocsr()
+    weights = np.array([weight for _, _, weight in matcher.entries], dtype=np.int64)
+    score = current @ weights
+    vetoed = np.asarray(found[:, k:].sum(axis=1)).ravel() > 0
+
+    core = np.array([i for i, (group, _, _) in enumerate(matcher.entries) if group in matcher.core_groups], dtype=np.int64)
+    best = _first_row_max(current[:, core]) if len(core) else np.full(len(archive.docs), -1)
+    best = np.where(best >= 0, core[np.maximum(best, 0)] if len(core) else -1, -1)
+    thresholds = np.array([matcher.threshold(group) for group, _, _ in matcher.entries], dtype=np.int64)
+    matched = ~vetoed & (best >= 0) & (score >= thresholds[np.maximum(best, 0)])
+
+    return [
+        (matcher.entries[entry][1], matcher.entries[entry][0]) if ok else (None, None)
+        for entry, ok in zip(best.tolist(), matched.tolist())
+    ]
 
 # --- Communication ---
 
-def send_email(matched_articles_data):
+def digest_rank(group):
+    """Digest section of a keyword group, as a priority: 2 MTFA, 1 Competitor, 0 General."""
+    group = group or ""
+    if any(x in group for x in ["MTFA", "Ihsan", "Darul"]):
+        return 2
+    return 1 if "Competitor" in group else 0
+
+def source_label(link):
+    host = urllib.parse.urlsplit(link).hostname or link
+    return host[4:] if host.startswith("www.") else host
+
+def render_email(matched_articles_data):
+    """
+    Builds the digest. Returns (subject, html_body, to_recipients, cc_recipients).
+    """
     sgt_tz = timezone(timedelta(hours=8))
     today = datetime.now(sgt_tz).strftime('%A, %d %B %Y')
     brand_green = "#006a4e"
@@ -245,12 +2337,11 @@ def send_email(matched_articles_data):
         mtfa_hits = 0
     else:
         for art in matched_articles_data:
-            group = art.get('keyword_group', '')
-            if not group: group = ""
+            rank = digest_rank(art.get('keyword_group'))
             
-            if any(x in group for x in ["MTFA", "Ihsan", "Darul"]):
+            if rank == 2:
                 mtfa_articles.append(art)
-            elif "Competitor" in group:
+            elif rank == 1:
                 competitor_articles.append(art)
             else:
                 general_articles.append(art)
@@ -267,6 +2358,13 @@ def send_email(matched_articles_data):
                 safe_alt = art['headline'].replace('"', "'")
                 
                 img_html = f'<img src="{art["image"]}" alt="{safe_alt}" style="width:100%; height:auto; display:block; border-radius:8px 8px 0 0;">' if art["image"] else ""
+                sources_html = ""
+                if art.get("sources"):
+                    source_links = " · ".join(
+                        f'<a href="{src["link"]}" title="{src["headline"].replace(chr(34), chr(39))}" style="color:{brand_blue}; text-decoration:none;">{source_label(src["link"])}</a>'
+                        for src in art["sources"]
+                    )
+                    sources_html = f'<p class="text-muted" style="font-size:12px; color:#888; margin:0;">Also reported by: {source_links}</p>'
                 
                 html += f"""
                 <div class="card" style="background:white; border:1px solid #ddd; border-radius:12px; margin-bottom:20px; overflow:hidden; box-shadow:0 2px 8px rgba(0,0,0,0.05);">
@@ -275,6 +2373,7 @@ def send_email(matched_articles_data):
                         <span style="background:{s_style['bg']}; color:{s_style['text']}; padding:3px 10px; border-radius:15px; font-size:11px; font-weight:bold;">{art['sentiment']}</span>
                         <h3 class="text-dark" style="margin:10px 0; color:#333; font-size:18px;">{art['headline']}</h3>
                         <p class="text-dark" style="font-size:14px; line-height:1.6; color:#444;">{highlighted}</p>
+                        {sources_html}
                         <div style="margin-top:15px; display:flex; justify-content:space-between; align-items:center; font-size:11px; color:#888;">
                             <a href="{art['link']}" style="color:{brand_blue}; font-weight:bold; text-decoration:none;">Read Full Article →</a>
                             <span class="text-muted">{art['keyword_group']} | {art['date'].strftime('%d %b')}</span>
@@ -355,11 +2454,23 @@ def send_email(matched_articles_data):
     </body>
     </html>"""
 
+    return f"MTFA News Brief: {today}{subject_alert}", email_body, to_recipients, cc_recipients
+
+def send_email(matched_articles_data):
+    import smtplib
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+    from email.mime.image import MIMEImage
+
+    with STATS.stage("render_email"):
+        subject, email_body, to_recipients, cc_recipients = render_email(matched_articles_data)
+    total_count = len(matched_articles_data)
+
     sender = os.getenv("SENDER_EMAIL", "ath@mtfa.org")
     pw = os.getenv("EMAIL_PASSWORD")
     
     msg = MIMEMultipart('related')
-    msg['Subject'] = f"MTFA News Brief: {today}{subject_alert}"
+    msg['Subject'] = subject
     msg['From'] = f"MTFA Media Bot <{sender}>"
     msg['To'] = ", ".join(to_recipients)
     if cc_recipients:
@@ -394,100 +2505,304 @@ def send_email(matched_articles_data):
 
     if pw:
         try:
-            with smtplib.SMTP_SSL('smtp.gmail.com', 465) as server:
+            smtp_class = smtplib.SMTP_SSL if SMTP_SSL else smtplib.SMTP
+            with STATS.stage("smtp_send"), smtp_class(SMTP_HOST, SMTP_PORT) as server:
                 server.login(sender, pw)
                 server.send_message(msg)
                 logging.info(f"Email sent successfully with {total_count} articles.")
+            return True
         except Exception as e:
             logging.error(f"Failed to send email: {e}")
+    return False
+
+def write_digest_preview(matched_articles_data, path=DIGEST_PREVIEW_FILE):
+    subject, email_body, to_recipients, cc_recipients = render_email(matched_articles_data)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(email_body)
+    logging.info(f"Digest preview '{subject}' with {len(matched_articles_data)} articles written to {path}.")
+    return path
 
 # --- Execution ---
-if __name__ == "__main__":
-    rss_feeds = [
-        "https://www.straitstimes.com/news/singapore/rss.xml",
-        "https://www.channelnewsasia.com/api/v1/rss-outbound-feed?_format=xml&category=10416",
-        "https://www.todayonline.com/feed",
-        "https://www.asiaone.com/rss/latest.xml",
-        "https://news.google.com/rss/search?q=site:beritaharian.sg",
-        "https://news.google.com/rss/search?q=site:businesstimes.com.sg+charity+OR+non-profit+OR+philanthropy",
-        "https://news.google.com/rss/search?q=site:muis.gov.sg",
-        "https://news.google.com/rss/search?q=site:msf.gov.sg+OR+%22Ministry+of+Social+and+Family+Development%22",
-        "https://news.google.com/rss?q=Muslimin+Trust+Fund+Association+Singapore",
-        "https://news.google.com/rss/search?q=%22National+Kidney+Foundation%22+NKF+Singapore",
-        "https://news.google.com/rss/search?q=%22Kidney+Dialysis+Foundation%22+KDF+Singapore",
-        "https://news.google.com/rss/search?q=%22Rahmatan+Lil+Alamin+Foundation%22+RLAF",
-        "https://news.google.com/rss/search?q=%22Association+of+Muslim+Professionals%22+AMP+Singapore",
-        "https://news.google.com/rss/search?q=%22Mendaki%22+Singapore",
-        "https://news.google.com/rss/search?q=%22Yayasan%22+Singapore+charity",
-        "https://news.google.com/rss/search?q=%22Community+Chest%22+Singapore+charity",
-        "https://news.google.com/rss/search?q=%22SG+Enable%22+Singapore+disability",
-        "https://news.google.com/rss/search?q=%22VWO%22+Singapore+charity+non-profit"
-    ]
-    all_data = []
-    seen = set()
-    limit = datetime.now(timezone.utc) - timedelta(hours=24)
-    
+
+def open_sheet():
     try:
+        import gspread
+        from google.oauth2.service_account import Credentials
+
         creds = Credentials.from_service_account_file(CREDENTIALS_FILE, scopes=["https://www.googleapis.com/auth/spreadsheets"])
         gs = gspread.authorize(creds)
-        sheet = gs.open_by_key(SHEET_ID).sheet1
-        try:
-            recent_links = sheet.col_values(6)[-200:]
-            seen.update(recent_links)
-        except Exception as e:
-            logging.warning(f"Could not load previous links for deduplication: {e}")
+        return gs.open_by_key(SHEET_ID).sheet1
     except Exception as e:
         logging.error(f"Sheet init failed: {e}")
-        sheet = None
+        return None
+
+def run_crawl(feeds=RSS_FEEDS, sheet=None, sequential=False, since=None, write_sheet=True, email=True, dry_run=False):
+    """
+    Runs one crawl over feeds and emails the digest. sheet defaults to the archive
+    worksheet; anything with col_values/append_rows works (the benchmark passes a fake).
+    sequential=True runs each stage to completion before the next instead of streaming.
+    since is the oldest publication time to include (default: 24 hours ago).
+    write_sheet=False leaves the rows in the local spool for the next run; email=False
+    skips the email and leaves today's journal open. dry_run does neither, records
+    nothing in the seen index or journal, and writes the digest to DIGEST_PREVIEW_FILE.
+    """
+    all_data = []
+    seen = SeenIndex(read_only=dry_run)
+    limit = since or datetime.now(timezone.utc) - timedelta(hours=24)
     
-    for url in rss_feeds:
-        feed = feedparser.parse(url)
-        for entry in feed.entries[:25]:
-            if entry.link in seen: continue
-            
-            try:
-                time_tuple = getattr(entry, 'published_parsed', getattr(entry, 'updated_parsed', None))
-                if time_tuple:
-                    pub_date = datetime(*time_tuple[:6]).replace(tzinfo=timezone.utc)
-                    if pub_date < limit: continue
-                else:
-                    continue
-            except: continue
-            
-            fetched_content, image = fetch_full_article_content(entry.link)
-            
-            junk_phrase = "Sign up now: Get ST's newsletters delivered to your inbox"
-            fetched_content = re.compile(re.escape(junk_phrase), re.IGNORECASE).sub("", fetched_content).strip()
-            
-            rss_summary_raw = getattr(entry, 'summary', '')
-            clean_rss_summary = re.sub(r'<[^>]+>', '', rss_summary_raw).strip()
-            
-            if len(fetched_content) > 100:
-                final_content = f"RSS Snippet: {clean_rss_summary}\n\nFull Text: {fetched_content}"
-            else:
-                final_content = clean_rss_summary if len(clean_rss_summary) > len(fetched_content) else fetched_content
-            
-            kw, group = contains_keywords(final_content, entry.title)
-            
-            if kw:
-                summary, sentiment = generate_summary(entry.title, final_content)
-                all_data.append({
-                    "headline": entry.title, 
-                    "summary": summary, 
-                    "link": entry.link, 
-                    "sentiment": sentiment, 
-                    "image": image, 
-                    "keyword_group": group, 
-                    "date": pub_date
-                })
-                seen.add(entry.link)
-                
-                if sheet:
-                    try: 
-                        # Reverted to original column order
-                        sheet.append_row([pub_date.strftime('%Y-%m-%d'), entry.title, summary, kw, group, entry.link])
-                    except: pass
+    if sheet is None and write_sheet and not dry_run:
+        sheet = open_sheet()
+
+    if sheet and (REBUILD_SEEN_INDEX or len(seen) == 0):
+        try:
+            seen.rebuild_from_sheet(sheet)
+        except Exception as e:
+            logging.warning(f"Could not rebuild seen index from the Sheet: {e}")
+    seen.prune()
+    sheet_writer = None if dry_run else SheetWriter(sheet)
+    journal = RunJournal(journal_dir=None if dry_run else JOURNAL_DIR)
+    journal.prune()
+
+    crawl = crawl_sequential if sequential else crawl_pipeline
+    triage, matches = crawl(feeds, seen, limit, journal)
+
+    cards = {}
+    for entry, pub_date, image, kw, group, summary, sentiment, rep in matches:
+        if rep == entry["link"]:
+            cards[rep] = {
+                "headline": entry["title"], 
+                "summary": summary, 
+                "link": entry["link"], 
+                "sentiment": sentiment, 
+                "image": image, 
+                "keyword_group": group, 
+                "date": pub_date,
+                "sources": []
+            }
+            all_data.append(cards[rep])
+        else:
+            cards[rep]["sources"].append({"headline": entry["title"], "link": entry["link"]})
+            # The card goes in the section of its highest-priority member, so an MTFA
+            # mention in a syndicated copy still counts as one.
+            if digest_rank(group) > digest_rank(cards[rep]["keyword_group"]):
+                cards[rep]["keyword_group"] = group
         
-        time.sleep(random.uniform(2, 5))
+        if sheet_writer and not journal.get(entry["link"], "written"):
+            # Reverted to original column order
+            sheet_writer.append([pub_date.strftime('%Y-%m-%d'), entry["title"], summary, kw, group, entry["link"]])
+            journal.record(entry["link"], "written")
+
+    if sheet_writer:
+        sheet_writer.flush()
+    shutdown_extract_pool()
+
+    audit_hits = {}
+    for entry, *_ in matches:
+        verdict, reason = triage[entry["link"]]
+        if verdict == "audit":
+            audit_hits[reason] = audit_hits.get(reason, 0) + 1
+    log_prefilter_report(triage, audit_hits)
+    seen.close()
+    SUMMARY_CACHE.log_stats()
+    URL_RESOLVER.log_stats()
+    GEMINI_CLIENT.log_stats()
+    STATS.incr("candidates", len(triage))
+    STATS.incr("downloads_avoided", sum(1 for verdict, _ in triage.values() if verdict == "prune"))
+    STATS.incr("matches", len(all_data))
+    if dry_run:
+        write_digest_preview(all_data)
+    elif email and send_email(all_data):
+        journal.complete()
+    journal.close()
+    return all_data
+
+def parse_since(value):
+    """Hours ago (e.g. "48") or an ISO date/time, read as UTC when it has no offset."""
+    try:
+        return datetime.now(timezone.utc) - timedelta(hours=float(value))
+    except ValueError:
+        pass
+    try:
+        since = datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected hours or an ISO date/time, got {value!r}")
+    return since if since.tzinfo else since.replace(tzinfo=timezone.utc)
+
+def feed_urls(value):
+    """
+    Parses one --feeds value: comma-separated http(s) URLs, or @file with one URL per
+    line (blank lines and # comments skipped).
+    """
+    if value.startswith("@"):
+        try:
+            with open(value[1:], "r", encoding="utf-8") as f:
+                urls = [line.strip() for line in f if line.strip() and not line.strip().startswith("#")]
+        except OSError as e:
+            raise argparse.ArgumentTypeError(f"cannot read {value[1:]}: {e}")
+    else:
+        urls = [url.strip() for url in value.split(",") if url.strip()]
+    for url in urls:
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.netloc:
+            raise argparse.ArgumentTypeError(f"not an http(s) feed URL: {url!r}")
+    if not urls:
+        raise argparse.ArgumentTypeError(f"no feed URLs in {value!r}")
+    return urls
+
+def score_files(paths, headline=""):
+    """Prints the keyword verdict for each text file ("-" reads stdin)."""
+    for path in paths:
+        if path == "-":
+            text = sys.stdin.read()
+        else:
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+        score, best_kw, best_group, vetoed = KEYWORD_MATCHER.evaluate(text, headline)
+        kw, group = contains_keywords(text, headline)
+        if vetoed:
+            verdict = "excluded (exclusion or political term)"
+        elif kw:
+            verdict = f"MATCH {group} ({kw})"
+        else:
+            verdict = "no match"
+        threshold = KEYWORD_MATCHER.threshold(best_group) if best_group else "-"
+        print(f"{path}: {verdict}; score {score}, threshold {threshold}, best group {best_group or '-'}")
+    return 0
 
-    send_email(all_data)
+def render_file(path, output=DIGEST_PREVIEW_FILE):
+    """Renders the digest from a JSON list of articles shaped like run_crawl's results."""
+    with open(path, "r", encoding="utf-8") as f:
+        articles = json.load(f)
+    for art in articles:
+        art["date"] = datetime.fromisoformat(art["date"]) if art.get("date") else datetime.now(timezone.utc)
+        for key in ("headline", "summary", "link", "image", "keyword_group"):
+            art.setdefault(key, "")
+        art.setdefault("sentiment", "NEUTRAL")
+    print(write_digest_preview(articles, output))
+    return 0
+
+def backfill_archive(paths, show=20, cache_file=BACKFILL_CACHE_FILE):
+    """
+    Re-scores journaled articles with the current keyword rules and prints how the
+    verdicts differ from the ones recorded when the articles were crawled.
+    """
+    archive = load_archive(paths)
+    if not archive:
+        print(f"No scored articles found in {', '.join(paths)}.")
+        return 1
+
+    start = time.perf_counter()
+    matrix = ArchiveMatrix([(headline, text) for _, headline, text, _, _ in archive], cache_file)
+    verdicts = classify_archive(matrix)
+    elapsed = time.perf_counter() - start
+    try:
+        matrix.save()
+    except Exception as e:
+        logging.warning(f"Could not save backfill cache: {e}")
+
+    changes = {"newly matched": [], "no longer matched": [], "group changed": [], "keyword changed": []}
+    before, after = {}, {}
+    for (link, headline, _, old_kw, old_group), (kw, group) in zip(archive, verdicts):
+        if old_kw:
+            before[old_group] = before.get(old_group, 0) + 1
+        if kw:
+            after[group] = after.get(group, 0) + 1
+        if bool(old_kw) != bool(kw):
+            change = "newly matched" if kw else "no longer matched"
+        elif group != old_group:
+            change = "group changed"
+        elif kw != old_kw:
+            change = "keyword changed"
+        else:
+            continue
+        changes[change].append((link, headline, old_group and f"{old_group} ({old_kw})", group and f"{group} ({kw})"))
+
+    unchanged = len(archive) - sum(len(items) for items in changes.values())
+    print(f"Re-scored {len(archive)} articles in {elapsed:.2f}s ({len(matrix.scanned)} scanned, the rest from {cache_file}).")
+    print(f"  unchanged: {unchanged}")
+    for change, items in changes.items():
+        print(f"  {change}: {len(items)}")
+    for group in sorted(set(before) | set(after)):
+        if before.get(group, 0) != after.get(group, 0):
+            print(f"  {group}: {before.get(group, 0)} -> {after.get(group, 0)} matches")
+    for change, items in changes.items():
+        for link, headline, old, new in items[:show]:
+            print(f"[{change}] {old or 'no match'} -> {new or 'no match'}: {headline} <{link}>")
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Crawls the news feeds and emails the daily digest.",
+        epilog="--feeds can be repeated and takes URL,URL,... or @file with one URL per line.",
+    )
+    parser.add_argument("--sequential", action="store_true", help="run each stage to completion before the next (for debugging)")
+    parser.add_argument("--dry-run", action="store_true", help=f"no Sheet, no email, no seen/journal records; digest goes to {DIGEST_PREVIEW_FILE}")
+    parser.add_argument("--no-sheet", action="store_true", help="do not open the Sheet; rows stay spooled for the next run")
+    parser.add_argument("--no-email", action="store_true", help="do not send the digest")
+    parser.add_argument("--feeds", action="append", type=feed_urls, metavar="URL[,URL...]|@FILE", help="crawl these feeds instead of the built-in list")
+    parser.add_argument("--since", type=parse_since, metavar="HOURS|ISO", help="oldest publication time to include (default: 24 hours ago)")
+    sub = parser.add_subparsers(dest="command", metavar="{score,render,backfill}")
+    p = sub.add_parser("score", help="run the keyword matcher on text files")
+    p.add_argument("files", nargs="+", metavar="FILE", help="article text ('-' for stdin)")
+    p.add_argument("--headline", default="", help="headline to score with the text")
+    p = sub.add_parser("render", help="render the digest HTML from a JSON list of articles")
+    p.add_argument("file", metavar="FILE")
+    p.add_argument("-o", "--output", default=DIGEST_PREVIEW_FILE)
+    p = sub.add_parser(
+        "backfill", help="re-score journaled articles with the current keyword rules and diff the verdicts",
+        epilog=f"{JOURNAL_DIR} only keeps the last {JOURNAL_RETENTION_DAYS} days; each scheduled run also uploads its "
+               "journal as a crawl-journal-* artifact (gh run download --pattern 'crawl-journal-*' --dir journals). "
+               f"A first backfill scans every article, about as fast as scoring them one by one; "
+               f"later ones reuse the counts cached in {BACKFILL_CACHE_FILE} and only scan new articles and terms.",
+    )
+    p.add_argument("paths", nargs="*", default=[JOURNAL_DIR], metavar="PATH", help=f"journal files or directories (default: {JOURNAL_DIR})")
+    p.add_argument("--show", type=int, default=20, metavar="N", help="changed verdicts to list per kind of change")
+    args = parser.parse_args(argv)
+    crawl_flags = [flag for flag, value in (
+        ("--sequential", args.sequential), ("--dry-run", args.dry_run), ("--no-sheet", args.no_sheet),
+        ("--no-email", args.no_email), ("--feeds", args.feeds), ("--since", args.since),
+    ) if value]
+    if args.command and crawl_flags:
+        parser.error(f"{', '.join(crawl_flags)} only apply to a crawl, not to {args.command}")
+
+    if args.command == "score":
+        return score_files(args.files, args.headline)
+    if args.command == "render":
+        return render_file(args.file, args.output)
+    if args.command == "backfill":
+        return backfill_archive(args.paths, args.show)
+
+    profiler = None
+    if "cprofile" in CRAWL_PROFILE:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    if "tracemalloc" in CRAWL_PROFILE:
+        import tracemalloc
+        tracemalloc.start(10)
+
+    try:
+        run_crawl(
+            feeds=[url for urls in args.feeds for url in urls] if args.feeds else RSS_FEEDS, sequential=args.sequential, since=args.since,
+            write_sheet=not args.no_sheet, email=not args.no_email, dry_run=args.dry_run,
+        )
+    finally:
+        extra = {}
+        if profiler:
+            import io
+            import pstats
+            profiler.disable()
+            profiler.dump_stats(PROFILE_FILE)
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(30)
+            logging.info(f"cProfile top functions (full profile in {PROFILE_FILE}):\n{out.getvalue()}")
+        if "tracemalloc" in CRAWL_PROFILE:
+            current, peak = tracemalloc.get_traced_memory()
+            extra["memory"] = {"current_bytes": current, "peak_bytes": peak}
+            top = tracemalloc.take_snapshot().statistics("lineno")[:10]
+            logging.info("tracemalloc top allocations:\n" + "\n".join(str(stat) for stat in top))
+            tracemalloc.stop()
+        STATS.write_report(extra=extra)
+
+if __name__ == "__main__":
+    raise SystemExit(main())